@@ -0,0 +1,106 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class ActivityLogWriter:
+    """
+    Background writer for the logs and cicologs tables.
+
+    Request handlers only enqueue rows. A flusher thread bulk-inserts them,
+    one insert per table, whenever batch_size rows are waiting or
+    flush_interval seconds have passed. When the queue is full, callers
+    block for up to put_timeout seconds and then write the row themselves,
+    so a slow database slows requests down instead of dropping log rows.
+    """
+
+    def __init__(self, client, max_queue=10000, batch_size=100, flush_interval=1.0, put_timeout=0.5):
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def log(self, table, row):
+        self._ensure_started()
+        try:
+            self._queue.put((table, row), timeout=self.put_timeout)
+        except queue.Full:
+            print(f"Activity log queue full, writing {table} row inline")
+            self._insert(table, [row])
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        # Anything enqueued after the thread exited
+        self._write(self._drain(self._queue.qsize()))
+
+    def _ensure_started(self):
+        # Gunicorn forks workers, so each process needs its own flusher
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+        # Flush whatever is left on shutdown
+        while not self._queue.empty():
+            self._write(self._drain(self.batch_size))
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        by_table = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        for table, rows in by_table.items():
+            self._insert(table, rows)
+
+    def _insert(self, table, rows):
+        try:
+            self.client.table(table).insert(rows).execute()
+        except Exception as e:
+            print(f"Error writing {len(rows)} {table} rows: {str(e)}")
+
+
+def create_log_writer(client):
+    writer = ActivityLogWriter(
+        client,
+        max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        batch_size=int(os.getenv("LOG_BATCH_SIZE", "100")),
+        flush_interval=float(os.getenv("LOG_FLUSH_INTERVAL", "1.0")),
+    )
+    atexit.register(writer.close)
+    return writer
@@ -1,43 +1,321 @@
-from flask import Flask, request, jsonify
-from supabase import create_client
-from supabase.lib.client_options import ClientOptions
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from postgrest import APIError
 from dotenv import load_dotenv
-import hashlib
 import os
 import secrets
-import json
-from datetime import datetime, timezone
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from availability import RoomAvailability
+from availability_calendar import AvailabilityCalendar
+from db import blocking, create_data_access, fetch_all
+from activity_log import create_log_writer
+from guest_cache import GuestProfileCache
+from blacklist_index import BlacklistIndex
+from dashboard import DashboardSnapshot, guest_full_name
+from events import EventHub, format_sse
+from conditional import ConditionalResponder, ResourceVersions
+from singleflight import SingleFlight
+from passwords import create_password_hasher
+from auth import AuthError, TokenVerifier, bearer_token
+from face_id import FaceGallery
+from room_catalogue import RoomCatalogue
+from pydantic import ValidationError
+from schemas import (BookingEdit, BookingItem, BookingRequest, BulkBookingRequest, FaceEnrolment, FaceMatchRequest,
+                     FastJSONProvider, PreferencesRequest, StaffEdit, UserUpdate, parse_request, validation_messages)
+import metrics
 
 load_dotenv()
 
-# Supabase connection setup
+# Supabase connection setup (pooled sync client plus async execution path)
 url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_KEY")
-supabase = create_client(
-    url,
-    key,
-    options=ClientOptions(
-        auto_refresh_token=False,
-        persist_session=False,
+if os.getenv("SUPABASE_BACKEND") == "memory":
+    # Offline in-memory stand-in, used by benchmark.py; never loaded otherwise
+    from fake_supabase import create_memory_backend
+    memory_backend, supabase, async_db = create_memory_backend(
+        latency=float(os.getenv("SUPABASE_MEMORY_LATENCY", "0")),
+        observer=metrics.observe_upstream,
+        max_rows=int(os.getenv("SUPABASE_MAX_ROWS", 1000)),
     )
-)
+else:
+    supabase, async_db = create_data_access(url, key, observer=metrics.observe_upstream)
 admin = supabase.auth.admin
 
+# Background writer for logs/cicologs rows
+log_writer = create_log_writer(supabase)
+
+# Shared guest profile cache keyed by user_id
+guest_cache = GuestProfileCache(
+    supabase,
+    max_size=int(os.getenv("GUEST_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("GUEST_CACHE_TTL", "300")),
+)
+
+# Room table shared by the workers on this machine through an mmap'd
+# record array; a generation counter tells readers when it changed
+room_catalogue_dir = os.getenv("ROOM_CATALOGUE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "room_catalogue"))
+if os.getenv("SUPABASE_BACKEND") == "memory" and "ROOM_CATALOGUE_DIR" not in os.environ:
+    room_catalogue_dir = tempfile.mkdtemp(prefix="room-catalogue-")
+room_catalogue = RoomCatalogue(
+    supabase,
+    room_catalogue_dir,
+    max_age=float(os.getenv("ROOM_CATALOGUE_MAX_AGE", "300")),
+)
+
+# Staff dashboard snapshot, reconciled with the database periodically
+dashboard = DashboardSnapshot(
+    supabase,
+    room_catalogue,
+    reconcile_interval=float(os.getenv("DASHBOARD_RECONCILE_INTERVAL", "60")),
+)
+
+# Pushes dashboard changes to /stream/room-status subscribers. Under the
+# gthread worker every open stream holds one of the worker's threads for
+# as long as it is connected, so streams get at most a quarter of them and
+# the rest stay free for the other routes (see gunicorn.conf.py). With the
+# default 8 threads that is 2 streams per worker, 4 across the default 2
+# workers; raise GUNICORN_THREADS or SSE_MAX_SUBSCRIBERS for more desks.
+#
+# The hub is per process: it only hears changes made by its own worker.
+# Room changes from other workers move the shared room catalogue's
+# generation, which streams poll every SSE_POLL_SECONDS and answer with a
+# fresh snapshot. Booking-only changes (new or edited bookings) from other
+# workers still arrive with the next dashboard reconcile.
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "8"))
+SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", str(max(1, GUNICORN_THREADS // 4))))
+if os.getenv("GUNICORN_WORKER_CLASS", "gthread") == "gthread" and SSE_MAX_SUBSCRIBERS > GUNICORN_THREADS - 2:
+    print(f"SSE_MAX_SUBSCRIBERS={SSE_MAX_SUBSCRIBERS} would starve the {GUNICORN_THREADS} gthread threads; capping it")
+    SSE_MAX_SUBSCRIBERS = max(1, GUNICORN_THREADS - 2)
+room_events = EventHub(max_subscribers=SSE_MAX_SUBSCRIBERS)
+dashboard.add_listener(room_events.publish)
+
+# Version counters and ETag/304 handling for the polled listing routes;
+# identical requests that miss the cache together share one render
+versions = ResourceVersions()
+listing_flights = SingleFlight(window=float(os.getenv("LISTING_COALESCE_WINDOW", "0")))
+conditional = ConditionalResponder(
+    versions,
+    max_age=float(os.getenv("LISTING_CACHE_MAX_AGE", "5")),
+    flights=listing_flights,
+)
+dashboard.add_listener(lambda event, data: versions.bump("rooms", "bookings"))
+versions.link("rooms", room_catalogue.generation)
+SSE_KEEPALIVE_SECONDS = 15
+SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "2"))
+
+# Free rooms per type and night, cached per date window
+availability_calendar = AvailabilityCalendar(
+    supabase,
+    room_catalogue,
+    ttl=float(os.getenv("AVAILABILITY_CACHE_TTL", "30")),
+)
+
+# Salted scrypt password hashing off the request thread
+password_hasher = create_password_hasher()
+
+# Local Supabase JWT checks for staff and admin routes
+token_verifier = TokenVerifier(
+    supabase,
+    jwt_secret=os.getenv("SUPABASE_JWT_SECRET") or (memory_backend.jwt_secret if os.getenv("SUPABASE_BACKEND") == "memory" else None),
+    max_size=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+)
+STAFF_ROLES = tuple(os.getenv("STAFF_ROLES", "staff,admin").split(","))
+ADMIN_ROLES = tuple(os.getenv("ADMIN_ROLES", "admin").split(","))
+
+# Face embeddings of consenting guests for kiosk identification, in an
+# index directory shared by the workers on this machine
+face_index_dir = os.getenv("FACE_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "face_index"))
+if os.getenv("SUPABASE_BACKEND") == "memory" and "FACE_INDEX_DIR" not in os.environ:
+    # A fresh in-memory database needs a fresh index
+    face_index_dir = tempfile.mkdtemp(prefix="face-index-")
+face_gallery = FaceGallery(
+    supabase,
+    face_index_dir,
+    dim=int(os.getenv("FACE_EMBEDDING_DIM", "128")),
+    threshold=float(os.getenv("FACE_MATCH_THRESHOLD", "0.6")),
+)
+
+# In-process blacklist email set
+blacklist_index = BlacklistIndex(
+    supabase,
+    refresh_interval=float(os.getenv("BLACKLIST_REFRESH_INTERVAL", "30")),
+)
+
 #secret key generator
 secret_key = secrets.token_hex(32)
 
 app = Flask(__name__)
 # Allow multiple origins
-CORS(app, resources={r"/*": {"origins": ["https://facialrecog-2b424.web.app", "http://localhost:5173"]}}, supports_credentials=True)
+CORS(app, resources={r"/*": {"origins": ["https://facialrecog-2b424.web.app", "http://localhost:5173"]}}, supports_credentials=True, expose_headers=["X-Next-Cursor", "ETag"])
 app.secret_key = secret_key
-
-#Hash Function
+app.json = FastJSONProvider(app)
+
+#Request bodies that fail their schema get one consistent 400
+@app.errorhandler(ValidationError)
+def handle_validation_error(e):
+    messages = validation_messages(e)
+    return jsonify({"success": False, "message": messages[0], "errors": messages}), 400
+
+# Request latency, upstream call and error metrics served at /metrics
+metrics.init_app(app)
+metrics.registry.describe("guest_cache_events_total", "counter", "Guest profile cache hits, misses and evictions.")
+metrics.registry.add_collector(lambda: [
+    ("guest_cache_events_total", (("event", event),), guest_cache.stats()[event])
+    for event in ("hits", "misses", "evictions")
+])
+metrics.registry.describe("auth_token_cache_events_total", "counter", "Verified-token cache hits and misses.")
+metrics.registry.add_collector(lambda: [
+    ("auth_token_cache_events_total", (("event", event),), token_verifier.stats()[event])
+    for event in ("hits", "misses")
+])
+metrics.registry.describe("listing_coalescing_total", "counter", "Listing cache misses that rendered, waited on an identical render, or reused a finished one.")
+metrics.registry.describe("listing_coalescing_ratio", "gauge", "Share of listing cache misses answered without rendering.")
+
+#Per-route coalescing counts, plus the ratio so it can be read without a query
+def coalescing_samples():
+    stats = sorted(listing_flights.stats().items())
+    samples = [
+        ("listing_coalescing_total", (("route", route), ("outcome", outcome)), count)
+        for route, counts in stats
+        for outcome, count in counts.items()
+    ]
+    for route, counts in stats:
+        total = sum(counts.values())
+        samples.append(("listing_coalescing_ratio", (("route", route),), (total - counts["executed"]) / total if total else 0))
+    return samples
+
+metrics.registry.add_collector(coalescing_samples)
+
+#Hash Function (salted scrypt, run in the hasher's process pool)
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    return password_hasher.hash(password)
+
+#Store a fresh hash if the stored one verifies but uses old parameters
+def rehash_guest_password(user_id, stored_hash, password):
+    try:
+        if not stored_hash or not password_hasher.needs_rehash(stored_hash):
+            return
+        if not password_hasher.verify(password, stored_hash):
+            return
+        supabase.table("guest").update({"password_hash": hash_password(password)}) \
+            .eq("user_id", user_id) \
+            .eq("password_hash", stored_hash) \
+            .execute()
+        guest_cache.invalidate(user_id)
+    except Exception as e:
+        print("Error rehashing password:", e)
+
+#Whether the request carries a verified access token for user_id
+def signed_in_as(user_id):
+    try:
+        return token_verifier.verify(bearer_token())["user_id"] == user_id
+    except AuthError:
+        return False
 
 #Time Stamp
-timestamp = datetime.now().isoformat()
+def timestamp():
+    return datetime.now().isoformat()
+
+#Log listing settings
+LOG_PAGE_SIZE = 100
+LOG_MAX_PAGE_SIZE = 1000
+
+#Read cursor, page size and filters for a log listing from the query string
+def read_log_args(match_column):
+    try:
+        limit = int(request.args.get("limit", LOG_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1 or limit > LOG_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {LOG_MAX_PAGE_SIZE}")
+
+    # Cursors end up quoted inside a PostgREST or= filter
+    cursor = request.args.get("cursor")
+    if cursor and ('"' in cursor or "\\" in cursor):
+        raise ValueError("invalid cursor")
+
+    match_value = request.args.get(match_column)
+    return {
+        "limit": limit,
+        "cursor": cursor,
+        "since": request.args.get("since"),
+        "until": request.args.get("until"),
+        "match": (match_column, match_value) if match_value else None,
+        "stream": request.args.get("format") == "ndjson",
+    }
+
+#Keyset filter for rows after the cursor. With a tie column the cursor is
+#"<value>|<tie value>", so rows sharing the boundary value are not skipped
+def after_cursor(query, cursor_column, tie_column, cursor):
+    if tie_column and "|" in cursor:
+        value, tie = cursor.rsplit("|", 1)
+        return query.or_(f'{cursor_column}.lt."{value}",and({cursor_column}.eq."{value}",{tie_column}.lt."{tie}")')
+    return query.lt(cursor_column, cursor)
+
+#Cursor pointing just past row
+def cursor_after(row, cursor_column, tie_column):
+    if tie_column:
+        return f"{row[cursor_column]}|{row[tie_column]}"
+    return str(row[cursor_column])
+
+#Fetch one page of a log table, newest first, starting after the cursor
+def fetch_log_page(table, cursor_column, time_column, args, cursor, tie_column=None):
+    query = supabase.table(table).select("*")
+    if args["match"]:
+        query = query.eq(*args["match"])
+    if args["since"]:
+        query = query.gte(time_column, args["since"])
+    if args["until"]:
+        query = query.lt(time_column, args["until"])
+    if cursor:
+        query = after_cursor(query, cursor_column, tie_column, cursor)
+    query = query.order(cursor_column, desc=True)
+    if tie_column:
+        query = query.order(tie_column, desc=True)
+    return query.limit(args["limit"]).execute().data
+
+#Yield every page of a log table until it is exhausted
+def iter_log_pages(table, cursor_column, time_column, args, tie_column=None):
+    cursor = args["cursor"]
+    while True:
+        rows = fetch_log_page(table, cursor_column, time_column, args, cursor, tie_column)
+        if rows:
+            yield rows
+        if len(rows) < args["limit"]:
+            return
+        cursor = cursor_after(rows[-1], cursor_column, tie_column)
+
+#Return a single page as JSON, or every page as streamed NDJSON. cursor_column
+#must be unique, or be made unique together with tie_column
+def log_listing_response(table, cursor_column, time_column, args, tie_column=None):
+    if args["stream"]:
+        def generate():
+            for rows in iter_log_pages(table, cursor_column, time_column, args, tie_column):
+                for row in rows:
+                    yield app.json.dumps(row) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    rows = fetch_log_page(table, cursor_column, time_column, args, args["cursor"], tie_column)
+    response = jsonify(rows)
+    if len(rows) == args["limit"]:
+        response.headers["X-Next-Cursor"] = cursor_after(rows[-1], cursor_column, tie_column)
+    return response, 200
+
+#Delete rows left behind by a failed multi-table write, all at once,
+#together with any other compensating calls (e.g. blocking(...) ones)
+def rollback_rows(*targets, calls=()):
+    results = async_db.run(
+        *(lambda c, table=table, column=column, value=value: c.table(table).delete().eq(column, value).execute()
+          for table, column, value in targets),
+        *calls,
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            print("Rollback error:", result)
 
 """"
 GUEST FUNCTIONS
@@ -85,9 +363,9 @@ def register():
         
         # No facial opt in
         try:
-            #Inserting into guest table
-            guest_response = supabase.table("guest").insert(
-                {   
+            #Inserting into guest and profiles tables concurrently
+            guest_response, profile_response = async_db.run(
+                lambda c: c.table("guest").insert({
                     "user_id": user_id,
                     "first_name": first_name,
                     "last_name": last_name,
@@ -95,30 +373,28 @@ def register():
                     "mobile_number": mobile_number,
                     "password_hash": password_hash,
                     "facialid_consent": facialID_consent
-                }
-            ).execute()
-
-            try:
-                profile_response = supabase.table("profiles").insert({
+                }).execute(),
+                lambda c: c.table("profiles").insert({
                     "id": user_id,
                     "role": "guest"
-                }).execute()
-            except Exception as e:
-                print(e)
+                }).execute(),
+            )
 
             print("Profile Table respones:", profile_response)
 
+            # Drop any stale entry for this id
+            guest_cache.invalidate(user_id)
+
             # Check response after insertion
             if guest_response.data and profile_response.data:
                 return jsonify({"success": True, "message": "Registration successful!"}), 200
             else:
-                supabase.table("guest").delete().eq("user_id", user_id).execute()
-                supabase.table("profiles").delete().eq("id", user_id).execute()
+                rollback_rows(("guest", "user_id", user_id), ("profiles", "id", user_id))
                 return jsonify({"success": False, "message": "Error inserting into tables."}), 400
    
         except Exception as e:
-                supabase.table("guest").delete().eq("user_id", user_id).execute()
-                supabase.table("profiles").delete().eq("id", user_id).execute()
+                print("Error inserting guest rows:", e)
+                rollback_rows(("guest", "user_id", user_id), ("profiles", "id", user_id))
                 return jsonify({"success": False, "message": "Error inserting into tables."}), 400
         
     except Exception as e:
@@ -132,16 +408,21 @@ def check_blacklist():
     if not email:
         return jsonify({"error": "Email is required"}), 400
 
-    response = (
-        supabase.table("blacklist")
-        .select("email")
-        .eq("email", email)
-        .execute()
-    )
-
-    is_blacklisted = len(response.data) > 0
+    is_blacklisted = blacklist_index.contains(email)
     return jsonify({"is_blacklisted": is_blacklisted})
 
+#Check a list of emails against the blacklist in one request
+@app.route('/check_blacklist_bulk', methods=['POST'])
+@token_verifier.require(*STAFF_ROLES)
+def check_blacklist_bulk():
+    data = request.get_json(silent=True) or {}
+    emails = data.get('emails')
+
+    if not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+        return jsonify({"error": "A list of emails is required"}), 400
+
+    return jsonify({"results": blacklist_index.contains_many(emails)})
+
 #Grab User Data for display function
 @app.route("/get_user_data", methods=["GET"])
 def get_user_data():
@@ -150,11 +431,11 @@ def get_user_data():
         if not user_id:
             return jsonify({"success": False, "message": "User ID is required"}), 400
         
-        response = supabase.table("guest").select("*").eq("user_id", user_id).execute()
-        if not response.data:
+        guest = guest_cache.get(user_id)
+        if not guest:
             return jsonify({"success": False, "message": "User not found"}), 404
         
-        return jsonify({"success": True, "user_data": response.data[0]}), 200
+        return jsonify({"success": True, "user_data": guest}), 200
 
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -186,17 +467,15 @@ def change_password():
 
         try:
             #Get guest name for loggin purposes:
-            response = supabase.table("guest").select("email").eq("user_id", user_id).execute()
-            
-            email = response.data[0]["email"]
+            email = guest_cache.get(user_id)["email"]
         
-            #Log activity into supabase
-            supabase.table("logs").insert({
+            #Queue activity log
+            log_writer.log("logs", {
                 "id": user_id,
                 "email": email,
                 "activity": f"{email} changed their password",
-                "logged_time": timestamp
-            }).execute()
+                "logged_time": timestamp()
+            })
         except Exception as e:
             print(e)
             return jsonify({"success": False, "message": "Error logging password change"}), 500
@@ -206,6 +485,7 @@ def change_password():
 
         #Updatenew password into database
         supabase.table("guest").update({"password_hash": new_pw_hashed}).eq("user_id", user_id).execute()
+        guest_cache.invalidate(user_id)
 
         return jsonify({"success": True, "message": "Password updated successfully"}), 200
 
@@ -216,41 +496,18 @@ def change_password():
 #Saving preference function
 @app.route("/save_preferences", methods=["POST"])
 def save_preferences():
-    try:
-        # Get JSON data
-        data = request.json
-        print("Received preference data: ", data) #Debugging purposes
-
-        #Extracting user_id and preferences
-        user_id = data.get("user_id")
-        preferences = data.get("preferences")
-
-        #Error checking for presence of fields
-        if not user_id or not preferences:
-            return jsonify({"success": False, "Message": "Missing id or preferences!"}), 400
-        
-        # Destructure preferences
-        bed_type = preferences.get("bedType")
-        room_view = preferences.get("roomView")
-        floor_preference = preferences.get("floorPreference")
-        additional_features = preferences.get("additionalFeatures", {})
-
-        # Default additional features if not provided
-        extra_pillows = additional_features.get("extraPillows", False)
-        extra_beds = additional_features.get("extraBeds", False)
-        extra_towels = additional_features.get("extraTowels", False)
-        early_check_in = additional_features.get("earlyCheckIn", False)
+    # Validate user_id and preferences (missing features default to False)
+    data = parse_request(PreferencesRequest)
+    preferences = data.preferences
 
+    try:
         # Insert preferences into the room_preferences table
         response = supabase.table("room_preferences").upsert({
-            "user_id": user_id,
-            "bed_type": bed_type,
-            "room_view": room_view,
-            "floor_preference": floor_preference,
-            "extra_pillows": extra_pillows,
-            "extra_beds": extra_beds,
-            "extra_towels": extra_towels,
-            "early_check_in": early_check_in
+            "user_id": data.user_id,
+            "bed_type": preferences.bed_type,
+            "room_view": preferences.room_view,
+            "floor_preference": preferences.floor_preference,
+            **preferences.additional_features.model_dump()
         }).execute()
 
         # Check if there was an error in the response
@@ -264,79 +521,71 @@ def save_preferences():
         print("Error in save_preferneces: ", e)
         return jsonify({"Success": False,})
 
+#Postgres exclusion_violation, raised by the room_booking_no_overlap constraint
+BOOKING_OVERLAP_CODE = "23P01"
+
+#Load the booked intervals of the given rooms straight from the database,
+#paged so a busy room type is not cut off at max-rows
+def fetch_room_availability(room_ids):
+    bookings = fetch_all(lambda: supabase.table("room_booking")
+                         .select("room_id, check_in_date, check_out_date")
+                         .in_("room_id", room_ids)
+                         .order("reservation_id"))
+    return RoomAvailability.from_bookings(bookings, room_ids)
+
+#Insert a booking into the first free room, skipping rooms a concurrent request took first
+def insert_booking(rooms, availability, booking_data, check_in_date, check_out_date):
+    while True:
+        room = availability.first_free(rooms, check_in_date, check_out_date)
+        if room is None:
+            return None, None
+        try:
+            response = supabase.table("room_booking").insert({**booking_data, "room_id": room["room_id"]}).execute()
+            return room, response
+        except APIError as e:
+            if e.code != BOOKING_OVERLAP_CODE:
+                raise
+            availability.add(room["room_id"], check_in_date, check_out_date)
+
 #Booking Room
 @app.route("/book_room", methods=["POST"])
 def book_room():  
-    try:
-        # parse input data
-        data = request.json
-        
-        #Checking for required fields
-        required_fields = ["user_id", "room_type", "check_in_date", "check_out_date"]
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({"success": False, "message": f"Missing required field: {field}"}), 400
+    # Validate required fields and parse the dates once
+    data = parse_request(BookingRequest)
+    user_id = data.user_id
+    room_type = data.room_type
+    check_in_date = data.check_in_date
+    check_out_date = data.check_out_date
 
-        #Detail extraction
-        user_id = data.get("user_id")
-        room_type = data.get("room_type")
-        check_in_date = datetime.fromisoformat(data.get("check_in_date")).replace(tzinfo=timezone.utc)
-        check_out_date = datetime.fromisoformat(data.get("check_out_date")).replace(tzinfo=timezone.utc)
-
-        # Amenities
-        extra_towels = data.get("ExtraTowels", False)
-        room_service = data.get("RoomService", False)
-        spa_access = data.get("SpaAccess", False)
-        airport_pickup = data.get("AirportPickup", False)
-        late_checkout = data.get("LateCheckout", False)
-        
+    try:
         # Check for available rooms of the specified type
-        response = supabase.table("room").select("*").eq("room_type", room_type).execute()
-        all_room = response.data
+        all_room = room_catalogue.of_type(room_type)
         if not all_room:
             return jsonify({"success": False, "message": "No available rooms of the selected type"}), 400
 
-        suitable_room = None
-        for room in all_room:
-            # Check existing bookings for this room
-            bookings_response = supabase.table("room_booking") \
-                .select("check_in_date, check_out_date") \
-                .eq("room_id", room["room_id"]) \
-                .execute()
-            
-            # Check for overlapping bookings
-            conflict = False
-            for booking in bookings_response.data:
-                existing_start = datetime.fromisoformat(booking["check_in_date"]).astimezone(timezone.utc)
-                existing_end = datetime.fromisoformat(booking["check_out_date"]).astimezone(timezone.utc)
-                
-                # Check for date overlap
-                if (check_in_date < existing_end) and (check_out_date > existing_start):
-                    conflict = True
-                    break
-            
-            if not conflict:
-                suitable_room = room
-                break
+        # Check the dashboard's already-parsed intervals first. Only when
+        # they show nothing free go to the database, in case another worker
+        # freed a room since the snapshot was last reconciled
+        room_ids = [room["room_id"] for room in all_room]
+        availability = dashboard.room_availability(room_ids)
+        if availability.first_free(all_room, check_in_date, check_out_date) is None:
+            availability = fetch_room_availability(room_ids)
 
-        if not suitable_room:
-            return jsonify({"success": False, "message": "No available rooms for selected dates"}), 400
-
-        # Book the room
+        # Book the first free room
         booking_data = {
             "user_id": user_id,
-            "room_id": suitable_room["room_id"],
             "check_in_date": check_in_date.isoformat(),
             "check_out_date": check_out_date.isoformat(),
-            "extra_towels": extra_towels,
-            "room_service": room_service,
-            "spa_access": spa_access,
-            "airport_pickup": airport_pickup,
-            "late_checkout": late_checkout
+            **data.amenities()
         }
-        booking_response = supabase.table("room_booking").insert(booking_data).execute()
+        suitable_room, booking_response = insert_booking(all_room, availability, booking_data, check_in_date, check_out_date)
+
+        if not suitable_room:
+            return jsonify({"success": False, "message": "No available rooms for selected dates"}), 400
 
         if booking_response.data:
+            dashboard.booking_added(booking_response.data[0], guest_full_name(guest_cache.get(user_id)))
+            availability_calendar.invalidate()
             return jsonify({"success": True, "message": "Room booked successfully!", "room_number": suitable_room["room_number"]}), 200
         else:
             return jsonify({"success": False, "message": "Error booking room."}), 400
@@ -345,8 +594,151 @@ def book_room():
         print("Error in book_room:", str(e))
         return jsonify({"success": False, "message": "Internal server error"}), 500
 
+#Free rooms per room type for each night of a stay
+@app.route("/availability", methods=["GET"])
+def get_availability():
+    try:
+        check_in = datetime.fromisoformat(request.args.get("check_in_date", "")).date()
+        check_out = datetime.fromisoformat(request.args.get("check_out_date", "")).date()
+    except ValueError:
+        return jsonify({"success": False, "message": "check_in_date and check_out_date must be ISO dates"}), 400
+
+    nights = (check_out - check_in).days
+    if nights < 1:
+        return jsonify({"success": False, "message": "check_out_date must be after check_in_date"}), 400
+
+    try:
+        room_types = availability_calendar.window(check_in, nights)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        print("Error in availability:", str(e))
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+
+    room_type = request.args.get("room_type")
+    if room_type:
+        room_types = {room_type: room_types.get(room_type, {"total": 0, "free_per_night": [0] * nights, "free_for_stay": 0})}
+
+    return jsonify({
+        "success": True,
+        "nights": [(check_in + timedelta(days=i)).isoformat() for i in range(nights)],
+        "room_types": room_types
+    }), 200
+
+#Plan one room per bulk item from freshly fetched availability
+def plan_bulk_bookings(requests_ok):
+    # Candidate rooms come from the catalogue; their bookings take one query
+    room_types = sorted({item.room_type for _, item, _, _, _ in requests_ok})
+    rooms_by_type = {}
+    availability = RoomAvailability()
+    if room_types:
+        rooms = room_catalogue.of_types(room_types)
+        for room in rooms:
+            rooms_by_type.setdefault(room["room_type"], []).append(room)
+
+        room_ids = [room["room_id"] for room in rooms]
+        if room_ids:
+            availability = fetch_room_availability(room_ids)
+
+    # Plan the allocation in one pass; each assignment blocks later items
+    rows = []
+    for result, item, user_id, check_in_date, check_out_date in requests_ok:
+        result.update({"success": False})
+        result.pop("room_number", None)
+        candidates = rooms_by_type.get(item.room_type)
+        if not candidates:
+            result["message"] = "No available rooms of the selected type"
+            continue
+
+        room = availability.first_free(candidates, check_in_date, check_out_date)
+        if not room:
+            result["message"] = "No available rooms for selected dates"
+            continue
+
+        availability.add(room["room_id"], check_in_date, check_out_date)
+        result.pop("message", None)
+        result.update({"success": True, "room_number": room["room_number"]})
+        rows.append({
+            "user_id": user_id,
+            "room_id": room["room_id"],
+            "check_in_date": check_in_date.isoformat(),
+            "check_out_date": check_out_date.isoformat(),
+            **item.amenities()
+        })
+    return rows
+
+#Bulk booking for groups and events (all or nothing)
+BULK_BOOKING_LIMIT = 200
+BULK_BOOKING_ATTEMPTS = 3
+
+@app.route("/book_rooms_bulk", methods=["POST"])
+def book_rooms_bulk():
+    data = parse_request(BulkBookingRequest)
+    items = data.items
+
+    try:
+        if len(items) > BULK_BOOKING_LIMIT:
+            return jsonify({"success": False, "message": f"At most {BULK_BOOKING_LIMIT} items per request"}), 400
+
+        # Validate every item before touching the database
+        results = []
+        requests_ok = []
+        for index, item in enumerate(items):
+            result = {"index": index, "success": False}
+            results.append(result)
+            try:
+                item = BookingItem.model_validate(item)
+            except ValidationError as e:
+                result["message"] = validation_messages(e)[0]
+                continue
+
+            user_id = item.user_id or data.user_id
+            if not user_id:
+                result["message"] = "Missing required field: user_id"
+                continue
+
+            requests_ok.append((result, item, user_id, item.check_in_date, item.check_out_date))
+
+        # A concurrent booking can take a planned room between planning and
+        # inserting; the insert then fails as a whole and is planned again
+        for attempt in range(BULK_BOOKING_ATTEMPTS):
+            rows = plan_bulk_bookings(requests_ok)
+
+            if len(rows) != len(items):
+                # Nothing is booked unless every item can be
+                for result in results:
+                    if result["success"]:
+                        result.update({"success": False, "message": "Not booked because another item failed"})
+                        result.pop("room_number", None)
+                return jsonify({"success": False, "message": "Some rooms could not be booked", "bookings": results}), 400
+
+            # One insert statement, so the database applies it all or nothing
+            try:
+                booking_response = supabase.table("room_booking").insert(rows).execute()
+                break
+            except APIError as e:
+                if e.code != BOOKING_OVERLAP_CODE:
+                    raise
+        else:
+            return jsonify({"success": False, "message": "Rooms are being booked concurrently, please retry"}), 409
+
+        if not booking_response.data:
+            return jsonify({"success": False, "message": "Error booking rooms."}), 400
+
+        for result, booking in zip(results, booking_response.data):
+            result["reservation_id"] = booking["reservation_id"]
+            dashboard.booking_added(booking, guest_full_name(guest_cache.get(booking["user_id"])))
+        availability_calendar.invalidate()
+
+        return jsonify({"success": True, "message": "Rooms booked successfully!", "bookings": results}), 200
+
+    except Exception as e:
+        print("Error in book_rooms_bulk:", str(e))
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+
 # Get booking list for display (Filtered by user_id)
 @app.route('/get_guest_bookingsGUEST', methods=['GET'])
+@conditional.cached("bookings")
 def get_guest_bookingsGUEST():
     try:
         user_id = request.args.get('user_id')  # Get user_id from query params
@@ -402,6 +794,10 @@ def cancel_booking(booking_id):
                 .update({'status': 'Available'}) \
                 .eq('room_id', booking_response.data[0]['room_id']) \
                 .execute()
+
+            dashboard.booking_removed(booking_id)
+            availability_calendar.invalidate()
+            dashboard.room_updated(booking_response.data[0]['room_id'], {'status': 'Available'})
             
             return jsonify({'success': True, 'message': 'Booking canceled'}), 200
         
@@ -414,28 +810,19 @@ def cancel_booking(booking_id):
 #Edit account details (Not password)
 @app.route("/update_user", methods=["POST"])
 def update_user():
-    try:
-        # Get JSON data
-        data = request.json
-
-        # Extract user ID and details
-        user_id = data.get("user_id")
-        first_name = data.get("first_name")
-        last_name = data.get("last_name")
-        mobile_number = data.get("mobile_number")
-        email = data.get("email")
-
-        # Check for required fields
-        if not user_id or not first_name or not last_name or not mobile_number or not email:
-            return jsonify({"success": False, "message": "Missing required fields"}), 400
+    # Validate user ID and details
+    data = parse_request(UserUpdate)
+    user_id = data.user_id
 
+    try:
         # Update the guest details
-        response = supabase.table("guest").update({
-            "first_name": first_name,
-            "last_name": last_name,
-            "mobile_number": mobile_number,
-            "email": email
-        }).eq("user_id", user_id).execute()
+        response = supabase.table("guest").update(data.model_dump(exclude={"user_id"}, exclude_none=True)).eq("user_id", user_id).execute()
+        guest_cache.invalidate(user_id)
+        versions.bump("bookings")
+
+        # Withdrawing facial ID consent removes the stored face right away
+        if data.facialid_consent is False:
+            forget_face(user_id)
 
         if 'error' in response:
             print("Supabase error:", response['error'])
@@ -447,29 +834,67 @@ def update_user():
         print("Error in edit_account_details:", e)
         return jsonify({"success": False, "message": "Internal server error"}), 500
 
-#edit booking
-@app.route("/edit_booking/<int:reservation_id>", methods=["PUT"]) 
-def edit_booking(reservation_id):
+#Drop a guest's face embedding: tombstone it in the shared index first so
+#no worker can match it any more, then delete the stored row
+def forget_face(user_id):
+    face_gallery.remove(user_id)
+    supabase.table("face_embedding").delete().eq("user_id", user_id).execute()
+
+#Current facialid_consent of a guest straight from the guest table (None if no such guest)
+def fetch_face_consent(user_id):
+    response = supabase.table("guest").select("facialid_consent").eq("user_id", user_id).execute()
+    return bool(response.data[0].get("facialid_consent")) if response.data else None
+
+#Enrol a consenting guest's face embedding for kiosk check-in (the guest's
+#own token, or staff enrolling on their behalf)
+@app.route("/face/enrol", methods=["POST"])
+@token_verifier.require()
+def enrol_face():
+    data = parse_request(FaceEnrolment)
+    if g.principal["user_id"] != data.user_id and g.principal["role"] not in STAFF_ROLES:
+        return jsonify({"success": False, "message": "Not allowed"}), 403
+
     try:
-        data = request.json
+        vector = face_gallery.normalise(data.embedding)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-        # Validate input
-        required_fields = ["check_in_date", "check_out_date"]
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({"success": False, "message": f"Missing {field}"}), 400
+    try:
+        # Consent is read from the database, never the guest cache, which
+        # can be minutes behind a withdrawal made on another worker
+        consent = fetch_face_consent(data.user_id)
+        if consent is None:
+            return jsonify({"success": False, "message": "Guest not found"}), 404
+        if not consent:
+            return jsonify({"success": False, "message": "Guest has not consented to facial ID"}), 403
 
-        # Convert dates to UTC
-        try:
-            new_check_in = datetime.fromisoformat(data["check_in_date"]).astimezone(timezone.utc)
-            new_check_out = datetime.fromisoformat(data["check_out_date"]).astimezone(timezone.utc)
-        except ValueError:
-            return jsonify({"success": False, "message": "Invalid date format"}), 400
+        supabase.table("face_embedding").upsert({
+            "user_id": data.user_id,
+            "embedding": vector.tolist()
+        }).execute()
+        face_gallery.enrol(data.user_id, vector)
 
-        # Validate date order
-        if new_check_in >= new_check_out:
-            return jsonify({"success": False, "message": "Check-out must be after check-in"}), 400
+        # A withdrawal that landed while enrolling may have run forget_face
+        # before the upsert; check again and undo it if so
+        if not fetch_face_consent(data.user_id):
+            forget_face(data.user_id)
+            return jsonify({"success": False, "message": "Guest has not consented to facial ID"}), 403
+
+        return jsonify({"success": True, "message": "Face enrolled successfully"}), 200
+
+    except Exception as e:
+        print("Error in enrol_face:", str(e))
+        return jsonify({"success": False, "message": "Internal server error"}), 500
 
+#edit booking
+@app.route("/edit_booking/<int:reservation_id>", methods=["PUT"]) 
+def edit_booking(reservation_id):
+    # Validate the new dates (UTC, check-out after check-in)
+    data = parse_request(BookingEdit)
+    new_check_in = data.check_in_date
+    new_check_out = data.check_out_date
+
+    try:
         # Get current booking
         booking_response = supabase.table("room_booking") \
             .select("room_id,check_in_date,check_out_date") \
@@ -484,19 +909,13 @@ def edit_booking(reservation_id):
 
         # Check for overlapping bookings
         conflicts_response = supabase.table("room_booking") \
-            .select("reservation_id,check_in_date,check_out_date") \
+            .select("reservation_id,room_id,check_in_date,check_out_date") \
             .eq("room_id", room_id) \
             .neq("reservation_id", reservation_id) \
             .execute()
 
-        conflict = False
-        for booking in conflicts_response.data:
-            existing_start = datetime.fromisoformat(booking["check_in_date"]).astimezone(timezone.utc)
-            existing_end = datetime.fromisoformat(booking["check_out_date"]).astimezone(timezone.utc)
-            
-            if (new_check_in < existing_end) and (new_check_out > existing_start):
-                conflict = True
-                break
+        availability = RoomAvailability.from_bookings(conflicts_response.data, [room_id])
+        conflict = not availability.is_free(room_id, new_check_in, new_check_out)
 
         if conflict:
             return jsonify({
@@ -510,14 +929,25 @@ def edit_booking(reservation_id):
             "check_out_date": new_check_out.isoformat()
         }
 
-        # Update booking
-        update_response = supabase.table("room_booking") \
-            .update(update_data) \
-            .eq("reservation_id", reservation_id) \
-            .execute()
+        # Update booking only if nobody changed it since it was read; the
+        # no-overlap constraint catches bookings added in the meantime
+        try:
+            update_response = supabase.table("room_booking") \
+                .update(update_data) \
+                .eq("reservation_id", reservation_id) \
+                .eq("check_in_date", current_booking["check_in_date"]) \
+                .eq("check_out_date", current_booking["check_out_date"]) \
+                .execute()
+        except APIError as e:
+            if e.code != BOOKING_OVERLAP_CODE:
+                raise
+            return jsonify({"success": False, "message": "Dates conflict with existing booking"}), 400
 
         if not update_response.data:
-            return jsonify({"success": False, "message": "Update failed"}), 500
+            return jsonify({"success": False, "message": "Booking was changed by another request, please retry"}), 409
+
+        dashboard.booking_updated(reservation_id, update_data)
+        availability_calendar.invalidate()
 
         return jsonify({
             "success": True,
@@ -537,19 +967,23 @@ def logIn_activity():
         
         user_id = data.get("user_id")
 
-        email = supabase.table("guest").select("email").eq("user_id", user_id).execute().data[0]["email"]
+        guest = guest_cache.get(user_id)
+        email = guest["email"]
         print(email)
 
-        response = supabase.table("logs").insert({
+        # Upgrade legacy or outdated password hashes while we have the
+        # password, but only for a caller already signed in as this guest;
+        # otherwise this route would be a password-guessing oracle
+        password = data.get("password")
+        if password and signed_in_as(user_id):
+            rehash_guest_password(user_id, guest.get("password_hash"), password)
+
+        log_writer.log("logs", {
             "id": user_id,         # This column references the guest's user_id
             "activity": f"{email} logged in",
             "email": email,
-            "logged_time": timestamp
-        }).execute()
-
-        if "error" in response:
-            print("Supabase error:", response["error"])
-            return jsonify({"success": False, "message": "Error logging activity"}), 500
+            "logged_time": timestamp()
+        })
 
         return jsonify({"success": True, "message": "Activity logged successfully"}), 200
 
@@ -565,19 +999,15 @@ def logOut_activity():
         print(data)
         user_id = data.get("user_id")
 
-        email = supabase.table("guest").select("email").eq("user_id", user_id).execute().data[0]["email"]
+        email = guest_cache.get(user_id)["email"]
         print(email)
 
-        response = supabase.table("logs").insert({
+        log_writer.log("logs", {
             "id": user_id,         
             "activity": f"{email} logged out",
             "email": email,
-            "logged_time": timestamp
-        }).execute()
-
-        if "error" in response:
-            print("Supabase error:", response["error"])
-            return jsonify({"success": False, "message": "Error logging activity"}), 500
+            "logged_time": timestamp()
+        })
 
         return jsonify({"success": True, "message": "Activity logged successfully"}), 200
 
@@ -590,21 +1020,11 @@ STAFF FUNCTIONS
 """
 #Adding blacklisted guest to table
 @app.route("/blacklist", methods=["POST"])
+@token_verifier.require(*STAFF_ROLES)
 def blacklist():
     try:
-        auth_header = request.headers.get("Authorization")  # Get token from headers
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return {"message": "Missing or invalid token"}, 401
-
-        token = auth_header.split("Bearer ")[1]
-        
-        response_dict = json.loads(token)
-
-        access_token = response_dict.get('session', {}).get('access_token', None)
-
-        user_repsonse = supabase.auth.get_user(access_token)
-
-        staff_id = user_repsonse.user.id
+        # Set by require() from the verified access token
+        staff_id = g.principal["user_id"]
 
         data = request.json
         email = data.get("email")
@@ -624,6 +1044,8 @@ def blacklist():
         }).execute()
 
         if blacklist_response.data:
+            blacklist_index.add(email)
+            versions.bump("blacklist")
             return jsonify({"sucess": True, "message": "Guest successfully blacklisted."}), 200
         else:
             return jsonify({"success": False, "message": "Error adding guest to blacklist."}), 4
@@ -633,14 +1055,13 @@ def blacklist():
 
 #fetch all blacklisted guest
 @app.route('/get_blacklisted_guests', methods=['GET'])
+@token_verifier.require(*STAFF_ROLES)
+@conditional.cached("blacklist")
 def get_blacklisted_guests():
     try:
         # Fetch blacklisted guests from the database
         response = supabase.table("blacklist").select("*").execute()
         
-        # Log the full Supabase response for debugging
-        print("Supabase Response:", response)
-        
         # Check if the response has a 'data' field and is not empty
         if hasattr(response, 'data') and response.data:
             return jsonify({
@@ -663,34 +1084,11 @@ def get_blacklisted_guests():
 
 #Fetch all bookings
 @app.route('/get_guest_bookings', methods = ['GET'])
+@token_verifier.require(*STAFF_ROLES)
+@conditional.cached("bookings")
 def get_guest_bookings():
     try:
-        response = supabase.table('room_booking') \
-                    .select('*, guest( first_name, last_name )').execute()
-
-        bookings = response.data
-
-        pending = []
-        checked_in = []
-
-        for booking in bookings:
-            guest = booking.get('guest', {})
-            booking_data = {
-                'id': booking['reservation_id'],
-                'name': f"{guest.get('first_name', '')} {guest.get('last_name', '')}".strip(),
-                'checkInDate': booking['check_in_date'] if booking['checkin_status'] else "-",
-                'checkOutDate': booking['check_out_date'] if booking['checkin_status'] else "-"
-            }
-            
-            if booking['checkin_status']:
-                checked_in.append(booking_data)
-            else:
-                pending.append(booking_data)
-                
-        return jsonify({
-            'pending': pending,
-            'checkedIn': checked_in
-        }), 200
+        return jsonify(dashboard.guest_bookings()), 200
     
     except Exception as e:
         print(f"Error retrieving guest bookings: {str(e)}")
@@ -698,6 +1096,7 @@ def get_guest_bookings():
 
 # checks guess out and logs activity
 @app.route('/check_out/<int:reservationId>', methods=['DELETE'])  # Changed to DELETE method
+@token_verifier.require(*STAFF_ROLES)
 def check_out(reservationId):
     try:
         rb_response = supabase.table('room_booking').select('user_id', 'room_id').eq('reservation_id', reservationId).execute()
@@ -706,25 +1105,25 @@ def check_out(reservationId):
             return jsonify({'success': False, 'message': 'Booking not found'}), 404
         user_id = rb_response.data[0]['user_id']
         room_id = rb_response.data[0]['room_id']
-        g_response = supabase.table('guest').select('first_name, last_name').eq('user_id', user_id).execute()
-        if not g_response.data:
+        guest = guest_cache.get(user_id)
+        if not guest:
             return jsonify({'success': False, 'message': 'Guest not found'}), 404
         
-        guest_name = f"{g_response.data[0]['first_name']} {g_response.data[0]['last_name']}"
+        guest_name = f"{guest['first_name']} {guest['last_name']}"
         
-        try:
-            supabase.table('cicologs').insert({
-                    "full_name": guest_name,
-                    "activity": f"Checked out of room {room_id}",
-                }).execute()
-        except Exception as e:
-            print(f"Error logging check-out activity: {str(e)}")
-            return jsonify({'success': False, 'message': 'Failed to log check-out activity'}), 500
-
         delete_response = supabase.table('room_booking').delete().eq('reservation_id', reservationId).execute()
 
         if delete_response.data:
             supabase.table('room').update({'status': 'Available'}).eq('room_id', room_id).execute()
+
+            dashboard.booking_removed(reservationId)
+            availability_calendar.invalidate()
+            dashboard.room_updated(room_id, {'status': 'Available'})
+
+            log_writer.log('cicologs', {
+                "full_name": guest_name,
+                "activity": f"Checked out of room {room_id}",
+            })
             
             return jsonify({'success': True, 'message': 'Check-out successful'}), 200
             
@@ -736,78 +1135,160 @@ def check_out(reservationId):
 
 #room status
 @app.route('/get-room-status', methods=['GET'])
+@token_verifier.require(*STAFF_ROLES)
+@conditional.cached("rooms")
 def get_room_status():
     try:
-        room_response = supabase.table('room').select('*').execute()
-        rooms = room_response.data  
-        
-        for room in rooms:
-            # Set default values for guestName and checkOutDate
-            room["guestName"] = ""
-            room["checkOutDate"] = ""
-            
-            # Map room_id to id for frontend
-            room["id"] = room.get("room_id")
-            
-            # Query for an active booking for this room (assuming checkin_status is True when checked in)
-            booking_response = supabase.table("room_booking") \
-                .select("check_out_date, user_id") \
-                .eq("room_id", room["room_id"]) \
-                .eq("checkin_status", True) \
-                .execute()
-            
-            if booking_response.data and len(booking_response.data) > 0:
-                booking = booking_response.data[0]
-                # Retrieve the guest's first and last name from the guest table
-                guest_response = supabase.table("guest") \
-                    .select("first_name, last_name") \
-                    .eq("user_id", booking["user_id"]) \
-                    .single() \
-                    .execute()
-                if guest_response.data:
-                    first_name = guest_response.data.get("first_name", "")
-                    last_name = guest_response.data.get("last_name", "")
-                    room["guestName"] = f"{first_name} {last_name}".strip()
-                room["checkOutDate"] = booking.get("check_out_date", "")
-        
-        return jsonify(rooms), 200
+        return jsonify(dashboard.room_status()), 200
 
     except Exception as e:
         print(f"Error retrieving room status: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to retrieve room status'}), 500
 
+#Push room status changes to the front desk over server-sent events
+@app.route('/stream/room-status', methods=['GET'])
+@token_verifier.require(*STAFF_ROLES, allow_query=True)
+def stream_room_status():
+    # Build the snapshot first so the rebuild is not also queued as an event
+    dashboard.ensure_fresh()
+    subscription = room_events.subscribe()
+    if subscription is None:
+        return jsonify({'success': False, 'message': 'Too many room status subscribers'}), 503
+
+    def generate():
+        try:
+            seen = room_catalogue.generation()
+            yield format_sse("snapshot", dashboard.room_status())
+            sent_at = next_poll = time.monotonic()
+            while not subscription.overflowed:
+                item = subscription.get(timeout=max(0, next_poll + SSE_POLL_SECONDS - time.monotonic()))
+                if item is not None:
+                    yield format_sse(*item)
+                    sent_at = time.monotonic()
+                if time.monotonic() - next_poll < SSE_POLL_SECONDS:
+                    continue
+                next_poll = time.monotonic()
+
+                # Room changes made by another worker never reach this hub,
+                # but they do move the shared catalogue
+                generation = room_catalogue.generation()
+                if generation != seen:
+                    seen = generation
+                    yield format_sse("snapshot", dashboard.room_status())
+                    sent_at = time.monotonic()
+                elif time.monotonic() - sent_at >= SSE_KEEPALIVE_SECONDS:
+                    # Keeps proxies from closing the connection and lets a
+                    # stale snapshot reconcile (and resend) while idle
+                    dashboard.ensure_fresh()
+                    yield ": keepalive\n\n"
+                    sent_at = time.monotonic()
+        finally:
+            subscription.close()
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 #Set room status to occupied and logs check in
+#Mark the booked room as occupied and log the check-in
+def occupy_room(reservation_id):
+    res_response = supabase.table("room_booking").select("room_id", "user_id").eq("reservation_id", reservation_id).execute()
+    
+    if not res_response.data:
+        return jsonify({"success": False, "message": "Booking not found"}), 404
+    
+    room_id = res_response.data[0]["room_id"]
+    user_id = res_response.data[0]["user_id"]
+    
+    guest = guest_cache.get(user_id)
+    
+    if not guest:
+        return jsonify({"success": False, "message": "Guest not found"}), 404
+    
+    guest_name = f"{guest['first_name']} {guest['last_name']}"
+
+    print(f"{guest_name} {room_id} {user_id}")
+    
+    response = supabase.table("room").update({"status": "Occupied"}).eq("room_id", room_id).execute()
+    
+    if response.data:
+        dashboard.room_updated(room_id, {"status": "Occupied"})
+
+        log_writer.log("cicologs", {
+            "full_name": guest_name,
+            "activity": f"Checked into room {room_id}",
+        })
+        
+        return jsonify({"success": True, "message": "Room status updated to 'Occupied'", "reservation_id": reservation_id}), 200
+    else:
+        return jsonify({"success": False, "message": "Failed to update room status"}), 400
+
 @app.route('/set-room-occupied/<int:reservationId>', methods=['PUT'])
+@token_verifier.require(*STAFF_ROLES)
 def set_room_occupied(reservationId):
     try:
-        res_response = supabase.table("room_booking").select("room_id", "user_id").eq("reservation_id", reservationId).execute()
-        
-        if not res_response.data:
-            return jsonify({"success": False, "message": "Booking not found"}), 404
-        
-        room_id = res_response.data[0]["room_id"]
-        user_id = res_response.data[0]["user_id"]
-        
-        g_response = supabase.table("guest").select("first_name", "last_name").eq("user_id", user_id).execute()
-        
-        if not g_response.data:
-            return jsonify({"success": False, "message": "Guest not found"}), 404
-        
-        guest_name = f"{g_response.data[0]['first_name']} {g_response.data[0]['last_name']}"
+        return occupy_room(reservationId)
 
-        print(f"{guest_name} {room_id} {user_id}")
-        
-        response = supabase.table("room").update({"status": "Occupied"}).eq("room_id", room_id).execute()
-        
-        if response.data:
-            supabase.table("cicologs").insert({
-                "full_name": guest_name,
-                "activity": f"Checked into room {room_id}",
-            }).execute()
-            
-            return jsonify({"success": True, "message": "Room status updated to 'Occupied'"}), 200
-        else:
-            return jsonify({"success": False, "message": "Failed to update room status"}), 400
+    except Exception as e:
+        print(f"Error setting room status to 'Occupied': {str(e)}")
+        return jsonify({"success": False, "message": "Failed to update room status"}), 500
+
+#Identify a guest at the kiosk from a face embedding
+@app.route('/face/match', methods=['POST'])
+@token_verifier.require(*STAFF_ROLES)
+def match_face():
+    data = parse_request(FaceMatchRequest)
+
+    try:
+        vector = face_gallery.normalise(data.embedding)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        matches = face_gallery.match(vector, k=data.k, threshold=data.threshold)
+        return jsonify({
+            "success": True,
+            "matches": [
+                {"user_id": user_id, "score": score, "name": guest_full_name(guest_cache.get(user_id))}
+                for user_id, score in matches
+            ]
+        }), 200
+
+    except Exception as e:
+        print(f"Error matching face: {str(e)}")
+        return jsonify({"success": False, "message": "Failed to match face"}), 500
+
+#Check in by face: match the embedding, then occupy the guest's next booking
+@app.route('/set-room-occupied', methods=['PUT'])
+@token_verifier.require(*STAFF_ROLES)
+def set_room_occupied_by_face():
+    data = parse_request(FaceMatchRequest)
+
+    try:
+        vector = face_gallery.normalise(data.embedding)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        matches = face_gallery.match(vector, k=1, threshold=data.threshold)
+        if not matches:
+            return jsonify({"success": False, "message": "No matching guest"}), 404
+        user_id, score = matches[0]
+
+        # Earliest booking of this guest that has not ended or been checked into
+        bookings = supabase.table("room_booking") \
+            .select("reservation_id") \
+            .eq("user_id", user_id) \
+            .eq("checkin_status", False) \
+            .gt("check_out_date", datetime.now(timezone.utc).isoformat()) \
+            .order("check_in_date") \
+            .limit(1) \
+            .execute().data
+        if not bookings:
+            return jsonify({"success": False, "message": "No upcoming booking for matched guest", "user_id": user_id}), 404
+
+        return occupy_room(bookings[0]["reservation_id"])
 
     except Exception as e:
         print(f"Error setting room status to 'Occupied': {str(e)}")
@@ -815,12 +1296,15 @@ def set_room_occupied(reservationId):
 
 #get guest log
 @app.route('/get_guest_logs', methods=['GET'])
+@token_verifier.require(*STAFF_ROLES)
 def get_guest_logs():
     try:
-        response = supabase.table("cicologs").select("*").execute()
-        logs = response.data
+        args = read_log_args("full_name")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-        return jsonify(logs), 200
+    try:
+        return log_listing_response("cicologs", "id", "created_at", args)
 
     except Exception as e:
         print(f"Error retrieving guest logs: {str(e)}")
@@ -828,6 +1312,7 @@ def get_guest_logs():
 
 #fetch checkin and check out date for display
 @app.route('/get_checkin_checkout/<int:guest_id>', methods=['GET'])
+@token_verifier.require(*STAFF_ROLES)
 def get_checkin_checkout(guest_id):
     try:
         print(guest_id)
@@ -855,28 +1340,52 @@ def get_checkin_checkout(guest_id):
 """"
 ADMIN FUNCTION
 """
+#Columns the admin UI may request from the employee table
+STAFF_COLUMNS = ("id", "email", "full_name", "active_status")
+STAFF_PAGE_SIZE = 100
+STAFF_MAX_PAGE_SIZE = 1000
+
 @app.route('/get_all_staff', methods=['GET'])
+@token_verifier.require(*ADMIN_ROLES)
+@conditional.cached("staff")
 def get_all_staff():
     try:
-        response =supabase.table("profiles").select("id").eq("role", "staff").execute()
-        staffId = response.data
-        print("Profiles query result:", staffId) 
-        
-        staff = []
-        
-        for staff_id in staffId:
-            staff_response = supabase.table("employee").select("*").eq("id", staff_id["id"]).execute()
-            print("Employee query result for", staff_id["id"], ":", staff_response.data)  # Debug log
-            if staff_response.data:
-                staff.append(staff_response.data[0])
-            
-        return jsonify(staff), 200
+        fields = request.args.get("fields")
+        columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(STAFF_COLUMNS)
+        sort = request.args.get("sort", "full_name")
+        sort_column = sort.lstrip("-")
+
+        try:
+            limit = int(request.args.get("limit", STAFF_PAGE_SIZE))
+            offset = int(request.args.get("offset", 0))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'limit and offset must be integers'}), 400
+
+        if any(column not in STAFF_COLUMNS for column in columns) or sort_column not in STAFF_COLUMNS:
+            return jsonify({'success': False, 'message': f"Columns must be one of: {', '.join(STAFF_COLUMNS)}"}), 400
+        if limit < 1 or limit > STAFF_MAX_PAGE_SIZE or offset < 0:
+            return jsonify({'success': False, 'message': f'limit must be between 1 and {STAFF_MAX_PAGE_SIZE}'}), 400
+
+        response = supabase.table("profiles").select("id").eq("role", "staff").execute()
+        staff_ids = [profile["id"] for profile in response.data]
+        if not staff_ids:
+            return jsonify([]), 200
+
+        staff_response = supabase.table("employee") \
+            .select(",".join(columns)) \
+            .in_("id", staff_ids) \
+            .order(sort_column, desc=sort.startswith("-")) \
+            .range(offset, offset + limit - 1) \
+            .execute()
+
+        return jsonify(staff_response.data), 200
         
     except Exception as e:
         print(f"Error retrieving staff: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to retrieve staff'}), 500
 
 @app.route("/add_staff", methods=["POST"])
+@token_verifier.require(*ADMIN_ROLES)
 def add_staff():
     try:
         # Get JSON data from frontend
@@ -902,20 +1411,32 @@ def add_staff():
             user_id = auth_response.user.id
         except Exception as e:
             print(f"Error creating user in Supabase Auth: {str(e)}")
+            return jsonify({"success": False, "message": "Failed to create auth user"}), 500
 
-        # Insert staff details into profiles table
-        profiles_response = supabase.table("profiles").insert({
-            "id": user_id,
-            "role": "staff"
-        }).execute()
-        
-        employee_response = supabase.table("employee").insert({
-            "id": user_id,
-            "email": email,
-            "full_name": "AnonStaff",
-            "password_hash": hash_password(password),
-            "active_status": True
-        }).execute()
+        password_hash = hash_password(password)
+
+        # Insert staff details into profiles and employee tables concurrently
+        try:
+            async_db.run(
+                lambda c: c.table("profiles").insert({
+                    "id": user_id,
+                    "role": "staff"
+                }).execute(),
+                lambda c: c.table("employee").insert({
+                    "id": user_id,
+                    "email": email,
+                    "full_name": "AnonStaff",
+                    "password_hash": password_hash,
+                    "active_status": True
+                }).execute(),
+            )
+        except Exception as e:
+            print(f"Error inserting staff rows: {str(e)}")
+            rollback_rows(("profiles", "id", user_id), ("employee", "id", user_id),
+                          calls=[blocking(supabase.auth.admin.delete_user, user_id)])
+            return jsonify({"success": False, "message": "Error adding staff"}), 500
+
+        versions.bump("staff")
         
         return jsonify({"success": True, "message": "Staff added successfully"}), 201
 
@@ -924,16 +1445,16 @@ def add_staff():
         return jsonify({"success": False, "message": "Error adding staff"}), 500
 
 @app.route("/delete_staff/<string:staff_id>", methods=["DELETE"])
+@token_verifier.require(*ADMIN_ROLES)
 def delete_staff(staff_id):
     try:
-        # Delete staff from profiles table
-        profiles_response = supabase.table("profiles").delete().eq("id", staff_id).execute()
-        
-        # Delete staff from employee table
-        employee_response = supabase.table("employee").delete().eq("id", staff_id).execute()
-        
-        # Delete staff from Supabase Auth
-        auth_response = supabase.auth.admin.delete_user(staff_id)
+        # Delete staff from profiles, employee and Supabase Auth concurrently
+        async_db.run(
+            lambda c: c.table("profiles").delete().eq("id", staff_id).execute(),
+            lambda c: c.table("employee").delete().eq("id", staff_id).execute(),
+            blocking(supabase.auth.admin.delete_user, staff_id),
+        )
+        versions.bump("staff")
         
         return jsonify({"success": True, "message": "Staff deleted successfully"}), 200
 
@@ -941,29 +1462,36 @@ def delete_staff(staff_id):
         print(f"Error deleting staff: {str(e)}")
         return jsonify({"success": False, "message": "Error deleting staff"}), 500
 
+@app.route("/guest_cache_stats", methods=["GET"])
+@token_verifier.require(*ADMIN_ROLES)
+def guest_cache_stats():
+    return jsonify(guest_cache.stats()), 200
+
 @app.route("/retrieve_logs", methods=["GET"])
+@token_verifier.require(*ADMIN_ROLES)
 def retrieve_logs():
     try:
-        response = supabase.table("logs").select("*").execute()
-        logs = response.data
+        args = read_log_args("email")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
-        return jsonify(logs), 200
+    try:
+        # logged_time is not unique; the guest id breaks ties
+        return log_listing_response("logs", "logged_time", "logged_time", args, tie_column="id")
 
     except Exception as e:
         print(f"Error retrieving logs: {str(e)}")
         return jsonify({"success": False, "message": "Error retrieving logs"}), 500
 
 @app.route("/edit_staff/<string:staff_id>", methods=["PUT"]) 
+@token_verifier.require(*ADMIN_ROLES)
 def edit_staff(staff_id):
-    try:
-        data = request.json
+    # Validate input: require at least email
+    data = parse_request(StaffEdit)
+    email = data.email
+    new_password = data.password  # Optional; if provided, update password
 
-        # Validate input: require at least email
-        if not data.get("email"):
-            return jsonify({"success": False, "message": "Missing email"}), 400
-
-        email = data.get("email")
-        new_password = data.get("password")  # Optional; if provided, update password
+    try:
 
         # Prepare update data for Supabase Auth
         update_data = {"email": email}
@@ -984,6 +1512,7 @@ def edit_staff(staff_id):
 
         # Update the employee record (assumes the employee table has "id" as the primary key)
         response = supabase.table("employee").update(employee_update_data).eq("id", staff_id).execute()
+        versions.bump("staff")
 
         if "error" in response:
             print("Supabase error:", response["error"])
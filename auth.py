@@ -0,0 +1,170 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request
+
+
+class AuthError(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+#Sign claims as an HS256 JWT, the way Supabase Auth does with its JWT secret
+def encode_hs256(claims, secret):
+    header = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64encode(json.dumps(claims).encode())
+    signature = hmac.new(secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64encode(signature)}"
+
+
+#Access token from the Authorization header: a bare JWT, or the JSON
+#session object the frontend sends ({"session": {"access_token": ...}}).
+#allow_query also takes ?access_token=, for routes that need it only
+def bearer_token(allow_query=False):
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        # EventSource cannot set headers, so the stream passes it in the
+        # query; anywhere else it would only leak into access logs
+        return request.args.get("access_token") if allow_query else None
+    token = auth_header[len("Bearer "):].strip()
+    if token.startswith("{"):
+        try:
+            return json.loads(token).get("session", {}).get("access_token")
+        except (ValueError, AttributeError):
+            return None
+    return token
+
+
+class TokenVerifier:
+    """
+    Checks Supabase access tokens in-process and caches the verdict.
+
+    HS256 tokens are verified against the project's JWT secret with hmac,
+    with no network call. Tokens signed some other way (asymmetric keys,
+    or no secret configured) are checked once with auth.get_user instead.
+    Either way the caller's role comes from the token's user_role or
+    app_metadata.role claim when present, otherwise from profiles.
+
+    Verified tokens are cached by their sha256 until the token expires,
+    or for at most max_age seconds so role changes still take effect.
+    """
+
+    def __init__(self, client, jwt_secret=None, max_size=1024, max_age=300, leeway=30, audience="authenticated"):
+        self.client = client
+        self.jwt_secret = jwt_secret
+        self.max_size = max_size
+        self.max_age = max_age
+        self.leeway = leeway
+        self.audience = audience
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token):
+        """{"user_id", "role", "exp"} for a valid token, or raises AuthError."""
+        if not token:
+            raise AuthError("Missing or invalid token")
+
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        claims = self._verified_claims(token, now)
+        principal = {
+            "user_id": claims["sub"],
+            "role": self._role(claims),
+            "exp": claims["exp"],
+        }
+        with self._lock:
+            self._entries[key] = (min(claims["exp"], now + self.max_age), principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return principal
+
+    def _verified_claims(self, token, now):
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = json.loads(_b64decode(header_segment))
+            claims = json.loads(_b64decode(payload_segment))
+            signature = _b64decode(signature_segment)
+        except (ValueError, TypeError):
+            raise AuthError("Malformed token")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise AuthError("Malformed token")
+
+        if header.get("alg") == "HS256" and self.jwt_secret:
+            expected = hmac.new(self.jwt_secret.encode(), f"{header_segment}.{payload_segment}".encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(signature, expected):
+                raise AuthError("Invalid token signature")
+        else:
+            # Not verifiable locally; GoTrue checks the signature for us
+            try:
+                user = self.client.auth.get_user(token).user
+            except Exception:
+                raise AuthError("Invalid token")
+            if user is None or user.id != claims.get("sub"):
+                raise AuthError("Invalid token")
+
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] + self.leeway < now:
+            raise AuthError("Token has expired")
+        if isinstance(claims.get("nbf"), (int, float)) and claims["nbf"] - self.leeway > now:
+            raise AuthError("Token is not valid yet")
+        if self.audience and claims.get("aud", self.audience) != self.audience:
+            raise AuthError("Token has the wrong audience")
+        if not claims.get("sub"):
+            raise AuthError("Token has no subject")
+        return claims
+
+    def _role(self, claims):
+        role = claims.get("user_role") or (claims.get("app_metadata") or {}).get("role")
+        if role:
+            return role
+        response = self.client.table("profiles").select("role").eq("id", claims["sub"]).execute()
+        return response.data[0]["role"] if response.data else None
+
+    def require(self, *roles, allow_query=False):
+        """Route decorator: 401 without a valid token, 403 without one of roles."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                try:
+                    principal = self.verify(bearer_token(allow_query))
+                except AuthError as e:
+                    return jsonify({"success": False, "message": e.message}), e.status
+                except Exception as e:
+                    print("Error verifying token:", e)
+                    return jsonify({"success": False, "message": "Could not verify token"}), 503
+                if roles and principal["role"] not in roles:
+                    return jsonify({"success": False, "message": "Not allowed"}), 403
+                g.principal = principal
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,112 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from functools import lru_cache
+
+
+#Parse a stored booking timestamp into an aware UTC datetime
+def parse_utc(value):
+    return datetime.fromisoformat(value).astimezone(timezone.utc)
+
+
+#Stored booking timestamp as integer epoch seconds. Rows come back with
+#the same strings on every request, so each one is only parsed once per
+#process.
+@lru_cache(maxsize=65536)
+def epoch_seconds(value):
+    return int(parse_utc(value).timestamp())
+
+
+def _as_epoch(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return value
+
+
+NO_INTERVALS = (array("q"), array("q"))
+
+
+class RoomAvailability:
+    """
+    Per-room sorted interval lists of existing bookings.
+
+    Each room keeps its check-ins and check-outs as two parallel arrays of
+    epoch seconds, so an overlap check is one bisect plus an integer
+    comparison. Bookings of a single room never overlap (the database's
+    no-overlap constraint rejects them), so both arrays are sorted and the
+    booking just before the requested check-out is the only one that could
+    clash. Methods take datetimes or epoch seconds.
+
+    A room's arrays are never changed in place: add() and remove() swap in
+    new ones. That makes subset() a cheap shallow copy, which is how a
+    request borrows rooms from a long-lived index (the dashboard's) and
+    marks its own tentative bookings without touching the shared one.
+    """
+
+    def __init__(self):
+        # room_id -> (check_ins, check_outs)
+        self._intervals = {}
+
+    @classmethod
+    def from_bookings(cls, bookings, room_ids=(), exclude_reservation=None):
+        by_room = {room_id: [] for room_id in room_ids}
+        for booking in bookings:
+            if exclude_reservation is not None and booking.get("reservation_id") == exclude_reservation:
+                continue
+            by_room.setdefault(booking["room_id"], []).append(
+                (epoch_seconds(booking["check_in_date"]), epoch_seconds(booking["check_out_date"]))
+            )
+
+        # Sort once per room instead of inserting one booking at a time
+        index = cls()
+        for room_id, stays in by_room.items():
+            stays.sort()
+            index._intervals[room_id] = (array("q", [s for s, _ in stays]), array("q", [e for _, e in stays]))
+        return index
+
+    def subset(self, room_ids):
+        index = RoomAvailability()
+        index._intervals = {room_id: self._intervals.get(room_id, NO_INTERVALS) for room_id in room_ids}
+        return index
+
+    def add(self, room_id, start, end):
+        starts, ends = self._intervals.get(room_id, NO_INTERVALS)
+        start = _as_epoch(start)
+        idx = bisect_left(starts, start)
+        starts = array("q", starts)
+        ends = array("q", ends)
+        starts.insert(idx, start)
+        ends.insert(idx, _as_epoch(end))
+        self._intervals[room_id] = (starts, ends)
+
+    def remove(self, room_id, start, end):
+        starts, ends = self._intervals.get(room_id, NO_INTERVALS)
+        start = _as_epoch(start)
+        end = _as_epoch(end)
+        idx = bisect_left(starts, start)
+        while idx < len(starts) and starts[idx] == start:
+            if ends[idx] == end:
+                starts = array("q", starts)
+                ends = array("q", ends)
+                del starts[idx]
+                del ends[idx]
+                self._intervals[room_id] = (starts, ends)
+                return
+            idx += 1
+
+    def is_free(self, room_id, start, end):
+        starts, ends = self._intervals.get(room_id, NO_INTERVALS)
+        # First booking that starts at or after the requested check-out
+        idx = bisect_left(starts, _as_epoch(end))
+        if idx == 0:
+            return True
+        # The booking just before it is the latest one starting earlier
+        return ends[idx - 1] <= _as_epoch(start)
+
+    def first_free(self, rooms, start, end):
+        start = _as_epoch(start)
+        end = _as_epoch(end)
+        for room in rooms:
+            if self.is_free(room["room_id"], start, end):
+                return room
+        return None
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from availability import epoch_seconds
+from db import fetch_all
+
+DAY = 86400
+
+
+class AvailabilityCalendar:
+    """
+    Free room counts per room type and per night for a date window.
+
+    A window is loaded from the room catalogue and the bookings that touch
+    the window (paged, so none are cut off) into a room x night occupancy
+    grid. A booking holds
+    the nights from its check-in date up to, but not including, its
+    check-out date. The grid is filled from a difference array and reduced
+    per room type in a few vectorised numpy calls.
+
+    Results are cached per window. Booking routes call invalidate(), and
+    entries also expire after ttl seconds so writes from other workers
+    show up.
+    """
+
+    def __init__(self, client, catalogue, max_windows=64, ttl=30, max_nights=366):
+        self.client = client
+        self.catalogue = catalogue
+        self.max_windows = max_windows
+        self.ttl = ttl
+        self.max_nights = max_nights
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def window(self, start, nights):
+        """{room_type: {"total", "free_per_night", "free_for_stay"}} for nights from start."""
+        if nights < 1 or nights > self.max_nights:
+            raise ValueError(f"a window must cover between 1 and {self.max_nights} nights")
+
+        key = (start, nights)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            generation = self._generation
+
+        result = self._compute(start, nights)
+        with self._lock:
+            # Drop results computed from data a booking route has since changed
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_windows:
+                    self._entries.popitem(last=False)
+        return result
+
+    def _compute(self, start, nights):
+        end = start + timedelta(days=nights)
+        rooms = self.catalogue.rooms()
+        bookings = fetch_all(lambda: self.client.table("room_booking")
+                             .select("reservation_id, room_id, check_in_date, check_out_date")
+                             .lt("check_in_date", end.isoformat())
+                             .gt("check_out_date", start.isoformat())
+                             .order("reservation_id"))
+
+        # Night offsets of each booking, clipped to the window
+        row_of = {room["room_id"]: i for i, room in enumerate(rooms)}
+        start_day = int(datetime(start.year, start.month, start.day, tzinfo=timezone.utc).timestamp()) // DAY
+        rows, first, last = [], [], []
+        for booking in bookings:
+            row = row_of.get(booking["room_id"])
+            if row is None:
+                continue
+            check_in = epoch_seconds(booking["check_in_date"]) // DAY - start_day
+            check_out = epoch_seconds(booking["check_out_date"]) // DAY - start_day
+            check_out = max(check_out, check_in + 1)
+            if check_out <= 0 or check_in >= nights:
+                continue
+            rows.append(row)
+            first.append(max(check_in, 0))
+            last.append(min(check_out, nights))
+
+        return self._count([room["room_type"] for room in rooms], nights, rows, first, last)
+
+    @staticmethod
+    def _count(room_types, nights, rows, first, last):
+        rows = np.asarray(rows, dtype=np.intp)
+        diff = np.zeros((len(room_types), nights + 1), dtype=np.int32)
+        np.add.at(diff, (rows, np.asarray(first, dtype=np.intp)), 1)
+        np.add.at(diff, (rows, np.asarray(last, dtype=np.intp)), -1)
+        free = np.cumsum(diff[:, :nights], axis=1) == 0
+
+        types = np.array(room_types, dtype=object)
+        result = {}
+        for room_type in sorted(set(room_types)):
+            grid = free[types == room_type]
+            result[room_type] = {
+                "total": int(grid.shape[0]),
+                "free_per_night": grid.sum(axis=0).tolist(),
+                "free_for_stay": int(grid.all(axis=1).sum()),
+            }
+        return result
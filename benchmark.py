@@ -0,0 +1,184 @@
+"""
+Load-test the Flask routes against the in-memory Supabase stand-in.
+
+    python benchmark.py --latency 0.005 --concurrency 8 --requests 200
+
+Seeds realistic table sizes, drives each route through the Flask test
+client from a thread pool and prints p50/p99 latency, throughput and
+upstream calls per request.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+ROOM_TYPES = ["Standard", "Deluxe", "Suite"]
+
+
+def seed(backend, rooms, guests, bookings_per_room, logs, rng):
+    backend.seed("room", [
+        {"room_id": i + 1, "room_number": 100 + i, "room_type": ROOM_TYPES[i % len(ROOM_TYPES)], "status": "Available"}
+        for i in range(rooms)
+    ])
+
+    guest_rows = [
+        {
+            "user_id": str(uuid.uuid4()),
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "email": f"guest{i}@example.com",
+            "mobile_number": f"9{i:07d}",
+            "password_hash": "x",
+            "facialid_consent": False,
+        }
+        for i in range(guests)
+    ]
+    backend.seed("guest", guest_rows)
+    backend.seed("profiles", [{"id": g["user_id"], "role": "guest"} for g in guest_rows])
+
+    staff_ids = [str(uuid.uuid4()) for _ in range(30)]
+    backend.seed("profiles", [{"id": staff_id, "role": "staff"} for staff_id in staff_ids])
+    backend.seed("employee", [
+        {"id": staff_id, "email": f"staff{i}@example.com", "full_name": f"Staff {i}", "password_hash": "x", "active_status": True}
+        for i, staff_id in enumerate(staff_ids)
+    ])
+
+    # Back-to-back stays per room so the data never overlaps
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    booking_rows = []
+    for room_id in range(1, rooms + 1):
+        check_in = start + timedelta(days=rng.randint(0, 5))
+        for _ in range(bookings_per_room):
+            check_out = check_in + timedelta(days=rng.randint(1, 5))
+            booking_rows.append({
+                "user_id": rng.choice(guest_rows)["user_id"],
+                "room_id": room_id,
+                "check_in_date": check_in.isoformat(),
+                "check_out_date": check_out.isoformat(),
+                "checkin_status": rng.random() < 0.1,
+            })
+            check_in = check_out + timedelta(days=rng.randint(0, 3))
+    backend.seed("room_booking", booking_rows)
+
+    backend.seed("logs", [
+        {"id": g["user_id"], "email": g["email"], "activity": f"{g['email']} logged in",
+         "logged_time": (start + timedelta(seconds=i * 37)).isoformat()}
+        for i, g in enumerate(rng.choice(guest_rows) for _ in range(logs))
+    ])
+    backend.seed("cicologs", [
+        {"full_name": f"First{i % guests} Last{i % guests}", "activity": f"Checked into room {i % rooms + 1}"}
+        for i in range(logs // 2)
+    ])
+    backend.seed("blacklist", [
+        {"email": guest_rows[i]["email"], "reason": "bench", "added_by": staff_ids[0]}
+        for i in range(0, guests, max(1, guests // 50))
+    ])
+    return guest_rows
+
+
+def scenarios(guest_rows, rng):
+    def book_room():
+        check_in = datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 365))
+        return "POST", "/book_room", {
+            "user_id": rng.choice(guest_rows)["user_id"],
+            "room_type": rng.choice(ROOM_TYPES),
+            "check_in_date": check_in.isoformat(),
+            "check_out_date": (check_in + timedelta(days=rng.randint(1, 4))).isoformat(),
+        }
+
+    return {
+        "book_room": book_room,
+        "get-room-status": lambda: ("GET", "/get-room-status", None),
+        "get_guest_bookings": lambda: ("GET", "/get_guest_bookings", None),
+        "get_guest_bookingsGUEST": lambda: ("GET", f"/get_guest_bookingsGUEST?user_id={rng.choice(guest_rows)['user_id']}", None),
+        "get_user_data": lambda: ("GET", f"/get_user_data?user_id={rng.choice(guest_rows)['user_id']}", None),
+        "check_blacklist": lambda: ("GET", f"/check_blacklist?email={rng.choice(guest_rows)['email']}", None),
+        "get_blacklisted_guests": lambda: ("GET", "/get_blacklisted_guests", None),
+        "retrieve_logs": lambda: ("GET", "/retrieve_logs", None),
+        "get_guest_logs": lambda: ("GET", "/get_guest_logs", None),
+        "get_all_staff": lambda: ("GET", "/get_all_staff", None),
+    }
+
+
+def run_scenario(app, backend, make_request, total, concurrency, headers=None):
+    local = threading.local()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        method, path, body = make_request()
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers=headers)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code >= 500:
+                errors += 1
+
+    backend.reset_calls()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "rps": total / wall,
+        "calls": backend.total_calls() / total,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.005, help="injected seconds per upstream call")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--guests", type=int, default=2000)
+    parser.add_argument("--bookings-per-room", type=int, default=20)
+    parser.add_argument("--logs", type=int, default=20000)
+    parser.add_argument("--routes", nargs="*", help="only run these routes")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ["SUPABASE_BACKEND"] = "memory"
+    os.environ["SUPABASE_MEMORY_LATENCY"] = str(args.latency)
+    import app as app_module
+
+    rng = random.Random(args.seed)
+    backend = app_module.memory_backend
+    guest_rows = seed(backend, args.rooms, args.guests, args.bookings_per_room, args.logs, rng)
+
+    # Staff and admin routes need a signed access token
+    backend.seed("profiles", [{"id": "bench-admin", "role": "admin"}])
+    headers = {"Authorization": f"Bearer {backend.issue_token('bench-admin')}"}
+
+    print(f"{'route':<26}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'calls/req':>11}{'5xx':>6}")
+    for name, make_request in scenarios(guest_rows, rng).items():
+        if args.routes and name not in args.routes:
+            continue
+        # Keep the routes' debug prints out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_scenario(app_module.app, backend, make_request, args.requests, args.concurrency, headers)
+        print(f"{name:<26}{result['p50']:>10.2f}{result['p99']:>10.2f}{result['rps']:>10.1f}"
+              f"{result['calls']:>11.2f}{result['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compare overlap checking over parsed epoch intervals with the old
+per-request ISO string parsing loop.
+
+    python benchmark_availability.py --rooms 300 --bookings-per-room 40
+
+Builds rooms x bookings-per-room back-to-back stays (12k by default) and
+checks a requested stay against every room, the way book_room does. It
+times the original loop, which parsed each booking's two timestamps with
+datetime.fromisoformat on every request, against:
+
+  - the long-lived index the dashboard snapshot keeps, which book_room
+    borrows with subset() (the normal path), and
+  - building a RoomAvailability from freshly fetched rows, which book_room
+    falls back to when the shared index shows nothing free.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from availability import RoomAvailability, epoch_seconds
+
+
+def make_bookings(rooms, per_room, rng):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    bookings = []
+    for room_id in range(1, rooms + 1):
+        check_in = start + timedelta(days=rng.randint(0, 5), hours=14)
+        for _ in range(per_room):
+            check_out = check_in + timedelta(days=rng.randint(1, 5), hours=-3)
+            bookings.append({
+                "room_id": room_id,
+                "check_in_date": check_in.isoformat(),
+                "check_out_date": check_out.isoformat(),
+            })
+            check_in = check_out + timedelta(days=rng.randint(0, 3), hours=3)
+    return bookings
+
+
+def old_free_rooms(rooms, bookings_by_room, check_in_date, check_out_date):
+    free = []
+    for room_id in rooms:
+        conflict = False
+        for booking in bookings_by_room.get(room_id, []):
+            existing_start = datetime.fromisoformat(booking["check_in_date"]).astimezone(timezone.utc)
+            existing_end = datetime.fromisoformat(booking["check_out_date"]).astimezone(timezone.utc)
+            if (check_in_date < existing_end) and (check_out_date > existing_start):
+                conflict = True
+                break
+        if not conflict:
+            free.append(room_id)
+    return free
+
+
+def shared_free_rooms(shared, rooms, check_in_date, check_out_date):
+    availability = shared.subset(rooms)
+    return [room_id for room_id in rooms if availability.is_free(room_id, check_in_date, check_out_date)]
+
+
+def rebuilt_free_rooms(rooms, bookings, check_in_date, check_out_date):
+    return shared_free_rooms(RoomAvailability.from_bookings(bookings, rooms), rooms, check_in_date, check_out_date)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--bookings-per-room", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bookings = make_bookings(args.rooms, args.bookings_per_room, rng)
+    rooms = list(range(1, args.rooms + 1))
+    bookings_by_room = {}
+    for booking in bookings:
+        bookings_by_room.setdefault(booking["room_id"], []).append(booking)
+
+    # A stay late in the booked period, so most rooms scan most of their list
+    check_in_date = datetime(2026, 1, 1, 14, tzinfo=timezone.utc) + timedelta(days=2 * args.bookings_per_room)
+    check_out_date = check_in_date + timedelta(days=2)
+
+    expected = old_free_rooms(rooms, bookings_by_room, check_in_date, check_out_date)
+    epoch_seconds.cache_clear()
+    shared = RoomAvailability.from_bookings(bookings)
+    assert shared_free_rooms(shared, rooms, check_in_date, check_out_date) == expected
+    assert rebuilt_free_rooms(rooms, bookings, check_in_date, check_out_date) == expected
+
+    results = [
+        ("fromisoformat loop", timed(lambda: old_free_rooms(rooms, bookings_by_room, check_in_date, check_out_date), args.repeat)),
+        ("shared epoch index", timed(lambda: shared_free_rooms(shared, rooms, check_in_date, check_out_date), args.repeat)),
+        ("rebuilt from rows", timed(lambda: rebuilt_free_rooms(rooms, bookings, check_in_date, check_out_date), args.repeat)),
+    ]
+
+    print(f"{len(bookings)} bookings across {args.rooms} rooms, {len(expected)} rooms free")
+    print(f"{'method':<24}{'ms/request':>12}{'speed-up':>10}")
+    for name, elapsed in results:
+        print(f"{name:<24}{elapsed:>12.3f}{results[0][1] / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
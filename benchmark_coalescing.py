@@ -0,0 +1,120 @@
+"""
+Fire bursts of identical dashboard requests, with and without coalescing.
+
+    python benchmark_coalescing.py --burst 12 --rounds 5 --latency 0.02
+
+Models shift start: --burst front-desk terminals request the same listing
+at the same instant, right after the listing's cached body has been
+invalidated by a write (a version bump) and the dashboard snapshot has
+gone stale. For get-room-status, get_guest_bookings and
+get_blacklisted_guests it prints, per burst, how many times the view
+rendered, how many upstream calls were made, and p50/max latency, first
+with every cache miss rendering on its own and then through the shared
+single-flight.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import threading
+import time
+
+ROUTES = {
+    "get-room-status": ("/get-room-status", "rooms"),
+    "get_guest_bookings": ("/get_guest_bookings", "bookings"),
+    "get_blacklisted_guests": ("/get_blacklisted_guests", "blacklist"),
+}
+
+
+class Uncoalesced:
+    """Baseline: every cache miss renders, counted the same way."""
+
+    def __init__(self):
+        self.executed = 0
+        self._lock = threading.Lock()
+
+    def do(self, group, key, fn):
+        with self._lock:
+            self.executed += 1
+        return fn()
+
+
+def burst(app_module, path, resource, size, headers):
+    app_module.versions.bump(resource)
+    app_module.dashboard.invalidate()
+    backend = app_module.memory_backend
+    backend.reset_calls()
+
+    barrier = threading.Barrier(size)
+    latencies = []
+    lock = threading.Lock()
+
+    def terminal():
+        client = app_module.app.test_client()
+        barrier.wait()
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        response.get_data()
+        assert response.status_code == 200, response.status_code
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=terminal) for _ in range(size)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return backend.total_calls(), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=12, help="simultaneous identical requests")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="injected seconds per upstream call")
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--guests", type=int, default=2000)
+    parser.add_argument("--bookings-per-room", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ["SUPABASE_BACKEND"] = "memory"
+    os.environ["SUPABASE_MEMORY_LATENCY"] = str(args.latency)
+    import app as app_module
+    from benchmark import seed
+
+    backend = app_module.memory_backend
+    seed(backend, args.rooms, args.guests, args.bookings_per_room, 0, random.Random(args.seed))
+    backend.seed("profiles", [{"id": "bench-admin", "role": "admin"}])
+    headers = {"Authorization": f"Bearer {backend.issue_token('bench-admin')}"}
+
+    # Warm the token cache and the room catalogue so bursts measure the listings
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path, _ in ROUTES.values():
+            app_module.app.test_client().get(path, headers=headers)
+
+    coalesced = app_module.conditional.flights
+    print(f"{'route':<24}{'mode':<12}{'renders':>9}{'upstream':>10}{'p50 ms':>9}{'max ms':>9}")
+    for name, (path, resource) in ROUTES.items():
+        for mode in ("per-request", "coalesced"):
+            flights = Uncoalesced() if mode == "per-request" else coalesced
+            app_module.conditional.flights = flights
+            before = flights.executed if mode == "per-request" else coalesced.stats().get(path, {}).get("executed", 0)
+
+            calls, latencies = [], []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(args.rounds):
+                    upstream, timings = burst(app_module, path, resource, args.burst, headers)
+                    calls.append(upstream)
+                    latencies.extend(timings)
+
+            after = flights.executed if mode == "per-request" else coalesced.stats()[path]["executed"]
+            print(f"{name:<24}{mode:<12}{(after - before) / args.rounds:>9.1f}{statistics.mean(calls):>10.1f}"
+                  f"{statistics.median(latencies) * 1000:>9.1f}{max(latencies) * 1000:>9.1f}")
+    app_module.conditional.flights = coalesced
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure face matching latency, worker startup and index size.
+
+    python benchmark_face.py --guests 10000 50000 --dim 128 512
+
+Seeds random embeddings into the in-memory database, builds the on-disk
+int8 index from it once, then opens the index the way a fresh worker
+would and times top-k matching for queries that are noisy copies of
+enrolled faces. Prints the build time, per-worker startup, p50/p99 per
+query, the index size on disk (shared through the page cache, not copied
+per worker) and how often the right guest came back first.
+
+The in-memory database caps selects at 1000 rows like Supabase does, so
+it exits non-zero if the index built from it, or the index left after an
+hourly consent reconcile, is missing any guest.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from face_id import FaceGallery
+from fake_supabase import create_memory_backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guests", type=int, nargs="*", default=[10000, 50000])
+    parser.add_argument("--dim", type=int, nargs="*", default=[128, 512])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.2, help="query noise relative to the embedding's spread")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    missing = []
+    print(f"{'guests':>8}{'dim':>6}{'build s':>9}{'open ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'MiB':>8}{'top-1':>8}")
+    for guests in args.guests:
+        for dim in args.dim:
+            backend, client, _ = create_memory_backend()
+            faces = rng.normal(size=(guests, dim)).astype(np.float32)
+            user_ids = [f"guest-{i}" for i in range(guests)]
+            backend.seed("guest", [{"user_id": user_id, "facialid_consent": True} for user_id in user_ids])
+            backend.seed("face_embedding", [{"user_id": user_id, "embedding": face} for user_id, face in zip(user_ids, faces)])
+
+            path = tempfile.mkdtemp(prefix="face-bench-")
+            started = time.perf_counter()
+            FaceGallery(client, path, dim=dim).ensure_loaded()
+            build = time.perf_counter() - started
+
+            # What every other worker does at startup
+            started = time.perf_counter()
+            gallery = FaceGallery(client, path, dim=dim, threshold=0.5)
+            gallery.ensure_loaded()
+            opened = (time.perf_counter() - started) * 1000
+            if len(gallery) != guests:
+                missing.append(f"{guests}x{dim}: built {len(gallery)} faces")
+
+            latencies = []
+            correct = 0
+            for _ in range(args.queries):
+                target = int(rng.integers(guests))
+                query = faces[target] + rng.normal(scale=args.noise, size=dim)
+                started = time.perf_counter()
+                matches = gallery.match(gallery.normalise(query), k=args.k)
+                latencies.append(time.perf_counter() - started)
+                correct += bool(matches) and matches[0][0] == user_ids[target]
+
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+            size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2 ** 20
+            print(f"{guests:>8}{dim:>6}{build:>9.1f}{opened:>9.2f}{p50:>9.2f}{p99:>9.2f}{size:>8.1f}{correct / args.queries:>8.1%}")
+
+            gallery.compact(reconcile=True)
+            if len(gallery) != guests:
+                missing.append(f"{guests}x{dim}: {len(gallery)} faces left after reconciling consent")
+
+    for problem in missing:
+        print(f"missing faces, {problem}")
+    sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare request parsing and response serialisation costs.
+
+    python benchmark_parsing.py --rows 1000
+
+Times the old hand-written book_room parsing (json.loads, field checks,
+datetime.fromisoformat) against BookingRequest.model_validate_json, and
+the standard json module against pydantic-core for a logs page and a
+room status listing. Prints microseconds per call and the CPU saved.
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import pydantic_core
+
+from schemas import BookingRequest
+
+
+def hand_parse(body):
+    data = json.loads(body)
+    for field in ["user_id", "room_type", "check_in_date", "check_out_date"]:
+        if field not in data or not data[field]:
+            raise ValueError(field)
+    check_in_date = datetime.fromisoformat(data.get("check_in_date")).replace(tzinfo=timezone.utc)
+    check_out_date = datetime.fromisoformat(data.get("check_out_date")).replace(tzinfo=timezone.utc)
+    amenities = {
+        "extra_towels": data.get("ExtraTowels", False),
+        "room_service": data.get("RoomService", False),
+        "spa_access": data.get("SpaAccess", False),
+        "airport_pickup": data.get("AirportPickup", False),
+        "late_checkout": data.get("LateCheckout", False)
+    }
+    return data["user_id"], data["room_type"], check_in_date, check_out_date, amenities
+
+
+def model_parse(body):
+    data = BookingRequest.model_validate_json(body)
+    return data.user_id, data.room_type, data.check_in_date, data.check_out_date, data.amenities()
+
+
+def per_call(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows in the listing responses")
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing for the request parsers")
+    args = parser.parse_args()
+
+    body = json.dumps({
+        "user_id": "6f1c0d7e-8d6b-4f3f-9a55-3d2e9c1b7a10",
+        "room_type": "Deluxe",
+        "check_in_date": "2026-03-01T14:00:00",
+        "check_out_date": "2026-03-04T11:00:00",
+        "SpaAccess": True,
+    }).encode()
+
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    logs = [
+        {"id": f"user-{i}", "email": f"guest{i}@example.com", "activity": f"guest{i}@example.com logged in",
+         "logged_time": (start + timedelta(seconds=i)).isoformat()}
+        for i in range(args.rows)
+    ]
+    rooms = [
+        {"room_id": i, "id": i, "room_number": 100 + i, "room_type": "Deluxe", "status": "Occupied",
+         "guestName": f"First{i} Last{i}", "checkOutDate": "2026-03-04T11:00:00+00:00"}
+        for i in range(args.rows)
+    ]
+    assert hand_parse(body) == model_parse(body)
+
+    cases = [
+        ("book_room body", lambda: hand_parse(body), lambda: model_parse(body), args.number),
+        (f"retrieve_logs x{args.rows}", lambda: json.dumps(logs), lambda: pydantic_core.to_json(logs), 50),
+        (f"get-room-status x{args.rows}", lambda: json.dumps(rooms), lambda: pydantic_core.to_json(rooms), 50),
+    ]
+
+    print(f"{'case':<26}{'before us':>12}{'after us':>12}{'saved':>9}")
+    for name, before, after, number in cases:
+        old = per_call(before, number)
+        new = per_call(after, number)
+        print(f"{name:<26}{old:>12.1f}{new:>12.1f}{(1 - new / old) * 100:>8.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Measure password hashing throughput for a range of scrypt costs.
+
+    python benchmark_passwords.py --n 14 15 16 --workers 1 2 4
+
+For each cost (n = 2**N) it times hashing inline on one core, then through
+the process pool at each worker count, and prints hashes/sec in total and
+per core. Pick the largest n whose per-core rate still covers peak
+register/change_password/login traffic with headroom.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passwords import PasswordHasher
+
+
+def measure(hasher, total, concurrency):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda i: hasher.hash(f"password-{i}"), range(total)))
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, nargs="*", default=[14, 15, 16], help="log2 of the scrypt n parameter")
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--hashes", type=int, default=40, help="hashes per measurement")
+    args = parser.parse_args()
+
+    print(f"{'n':>8}{'workers':>9}{'ms/hash':>10}{'hashes/s':>10}{'per core':>10}")
+    for log_n in args.n:
+        inline = PasswordHasher(n=2 ** log_n, r=args.r, p=args.p, workers=0)
+        rate = measure(inline, args.hashes, 1)
+        print(f"{2 ** log_n:>8}{'inline':>9}{1000 / rate:>10.1f}{rate:>10.1f}{rate:>10.1f}")
+
+        for workers in args.workers:
+            pooled = PasswordHasher(n=2 ** log_n, r=args.r, p=args.p, workers=workers)
+            pooled.hash("warm-up")  # start the worker processes outside the timing
+            rate = measure(pooled, args.hashes, workers * 2)
+            pooled.close()
+            print(f"{2 ** log_n:>8}{workers:>9}{1000 * workers / rate:>10.1f}{rate:>10.1f}{rate / workers:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from db import fetch_all
+
+
+def normalise_email(email):
+    return email.strip().lower()
+
+
+class BlacklistIndex:
+    """
+    In-process set of blacklisted emails.
+
+    The set is loaded on first use. After that, rows with an id above the
+    highest one seen are pulled every refresh_interval seconds. A full
+    reload every full_reload_interval seconds picks up rows that were
+    removed. The /blacklist route adds new emails straight away through add().
+    """
+
+    def __init__(self, client, refresh_interval=30, full_reload_interval=600):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self._emails = set()
+        self._last_id = None
+        self._refreshed_at = None
+        self._reloaded_at = None
+        self._lock = threading.Lock()
+
+    def contains(self, email):
+        self._refresh_if_stale()
+        return normalise_email(email) in self._emails
+
+    def contains_many(self, emails):
+        self._refresh_if_stale()
+        emails_set = self._emails
+        return {email: normalise_email(email) in emails_set for email in emails}
+
+    def add(self, email):
+        with self._lock:
+            self._emails.add(normalise_email(email))
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+            if self._reloaded_at is None or now - self._reloaded_at >= self.full_reload_interval:
+                self._reload()
+                self._reloaded_at = now
+            else:
+                self._refresh()
+            self._refreshed_at = now
+
+    # Both loads are paged: PostgREST drops rows past max-rows, and a
+    # missing email would be reported as not blacklisted
+    def _reload(self):
+        rows = fetch_all(lambda: self.client.table("blacklist").select("id, email").order("id"))
+        self._emails = {normalise_email(row["email"]) for row in rows}
+        self._last_id = max((row["id"] for row in rows), default=None)
+
+    def _refresh(self):
+        def newer():
+            select = self.client.table("blacklist").select("id, email").order("id")
+            return select.gt("id", self._last_id) if self._last_id is not None else select
+        rows = fetch_all(newer)
+        for row in rows:
+            self._emails.add(normalise_email(row["email"]))
+            if self._last_id is None or row["id"] > self._last_id:
+                self._last_id = row["id"]
@@ -0,0 +1,91 @@
+"""
+Check that /get-room-status costs the same number of upstream calls at any size.
+
+    python check_room_status_queries.py --rooms 10 200
+
+For each room count (grown in place, in the order given) it seeds that
+many rooms with a checked-in guest in every other one, drops every cache
+so the request has to go to the database, and counts the calls the
+in-memory Supabase stand-in sees for one cold and one warm request. It
+exits non-zero if either count grows with the number of rooms, which is
+what a per-room lookup sneaking back into the route would look like.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+
+def seed_rooms(backend, start, end):
+    backend.seed("room", [
+        {"room_id": i, "room_number": 100 + i, "room_type": "Standard", "status": "Available"}
+        for i in range(start, end)
+    ])
+    guests = [{"user_id": f"guest-{i}", "first_name": "Guest", "last_name": str(i), "email": f"guest{i}@example.com"}
+              for i in range(start, end, 2)]
+    backend.seed("guest", guests)
+    backend.seed("room_booking", [
+        {"user_id": guest["user_id"], "room_id": i, "checkin_status": True,
+         "check_in_date": "2026-10-15T14:00:00+00:00", "check_out_date": "2026-10-20T11:00:00+00:00"}
+        for i, guest in zip(range(start, end, 2), guests)
+    ])
+
+
+def measure(app_module, client, headers):
+    backend = app_module.memory_backend
+    app_module.dashboard.invalidate()
+    app_module.room_catalogue.invalidate()
+    app_module.versions.bump("rooms")
+
+    counts = []
+    for _ in range(2):
+        backend.reset_calls()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.get("/get-room-status", headers=headers)
+        assert response.status_code == 200, response.status_code
+        counts.append(backend.total_calls())
+    return counts, response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, nargs="+", default=[10, 200], help="room counts to compare, ascending")
+    args = parser.parse_args()
+
+    os.environ["SUPABASE_BACKEND"] = "memory"
+    import app as app_module
+
+    backend = app_module.memory_backend
+    backend.seed("profiles", [{"id": "check-staff", "role": "staff"}])
+    headers = {"Authorization": f"Bearer {backend.issue_token('check-staff')}"}
+    client = app_module.app.test_client()
+    # Verify the token once so its role lookup is not counted below
+    client.get("/get-room-status", headers=headers)
+
+    results = []
+    seeded = 1
+    for rooms in args.rooms:
+        seed_rooms(backend, seeded, rooms + 1)
+        seeded = rooms + 1
+        (cold, warm), rows = measure(app_module, client, headers)
+        assert len(rows) == rooms, f"expected {rooms} rooms, got {len(rows)}"
+        checked_in = sum(1 for booking in backend.rows("room_booking") if booking["checkin_status"])
+        assert sum(1 for row in rows if row["guestName"]) == checked_in
+        results.append((rooms, cold, warm))
+
+    print(f"{'rooms':>7}{'cold calls':>12}{'warm calls':>12}")
+    for rooms, cold, warm in results:
+        print(f"{rooms:>7}{cold:>12}{warm:>12}")
+
+    grew = [
+        (small, large) for small, large in zip(results, results[1:])
+        if large[1] > small[1] or large[2] > small[2]
+    ]
+    for (rooms, cold, warm), (more_rooms, more_cold, more_warm) in grew:
+        print(f"upstream calls grew from {cold}/{warm} at {rooms} rooms to {more_cold}/{more_warm} at {more_rooms}")
+    sys.exit(1 if grew else 0)
+
+
+if __name__ == "__main__":
+    main()
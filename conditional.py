@@ -0,0 +1,182 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+# ETag suffix per Content-Encoding of a cached body
+ENCODING_ETAG_SUFFIXES = {None: "", "gzip": "-gz", "br": "-br"}
+
+
+class ResourceVersions:
+    """Per-resource counters that write routes bump when data changes."""
+
+    def __init__(self):
+        self._versions = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def link(self, resource, source):
+        """Also change resource's version whenever source() does, e.g. a shared counter."""
+        self._sources[resource] = source
+
+    def bump(self, *resources):
+        with self._lock:
+            for resource in resources:
+                self._versions[resource] = self._versions.get(resource, 0) + 1
+
+    def get(self, resource):
+        source = self._sources.get(resource)
+        if source is not None:
+            return self._versions.get(resource, 0), source()
+        return self._versions.get(resource, 0)
+
+
+class CachedBody:
+    def __init__(self, version, body, mimetype):
+        self.version = version
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.created = time.monotonic()
+        self.encoded = {}
+
+    def encode(self, encoding):
+        if encoding not in self.encoded:
+            if encoding == "br":
+                self.encoded[encoding] = brotli.compress(self.body)
+            else:
+                self.encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self.encoded[encoding]
+
+
+class SharedResponse:
+    """A non-200 response rendered once and handed to every coalesced caller."""
+
+    def __init__(self, response):
+        self.body = response.get_data()
+        self.status = response.status_code
+        self.headers = list(response.headers.items())
+
+    def response(self):
+        return Response(self.body, status=self.status, headers=self.headers)
+
+
+#Query args as a cache key, in a stable order
+def normalised_args():
+    return tuple(sorted(request.args.items(multi=True)))
+
+
+class ConditionalResponder:
+    """
+    ETag, 304 and compression handling for read-heavy listing routes.
+
+    A route wrapped with cached("resource") keeps its last serialised 200
+    body per query string. While the resource version is unchanged and the
+    body is younger than max_age, the view is not called at all. max_age
+    bounds staleness from writes made by other workers, which do not bump
+    this worker's counters (a resource linked to a shared counter sees
+    those at once). The ETag is a hash of the body, so every worker
+    produces the same tag for the same data.
+
+    With a SingleFlight in flights, identical requests (same path, args
+    and resource version) that miss the cache together call the view
+    once and share its serialised body.
+    """
+
+    def __init__(self, versions, max_age=5, min_compress_size=1024, max_entries=256, flights=None):
+        self.versions = versions
+        self.flights = flights
+        self.max_age = max_age
+        self.min_compress_size = min_compress_size
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, resource):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = (resource, request.path, normalised_args())
+                entry = self._lookup(key, resource)
+                if entry is None:
+                    version = self.versions.get(resource)
+                    own = {}
+
+                    def render():
+                        response = own["response"] = make_response(view(*args, **kwargs))
+                        if response.is_streamed:
+                            return None
+                        if response.status_code != 200:
+                            return SharedResponse(response)
+                        rendered = CachedBody(version, response.get_data(), response.mimetype)
+                        self._store(key, rendered)
+                        return rendered
+
+                    if self.flights is None:
+                        entry = render()
+                    else:
+                        route = request.url_rule.rule if request.url_rule else request.path
+                        entry = self.flights.do(route, (key, version), render)
+
+                    if entry is None:
+                        # A stream cannot be shared; waiters render their own
+                        return own["response"] if own else view(*args, **kwargs)
+                    if isinstance(entry, SharedResponse):
+                        return own["response"] if own else entry.response()
+                return self._respond(entry)
+            return wrapper
+        return decorator
+
+    def _lookup(self, key, resource):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != self.versions.get(resource) or time.monotonic() - entry.created >= self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _respond(self, entry):
+        body = entry.body
+        encoding = None
+        if len(body) >= self.min_compress_size:
+            accepted = request.accept_encodings
+            if brotli is not None and accepted["br"]:
+                encoding = "br"
+            elif accepted["gzip"]:
+                encoding = "gzip"
+
+        # A strong ETag names one representation, so each coding gets its
+        # own; any of them still means the client has the current data
+        etag = entry.etag + ENCODING_ETAG_SUFFIXES[encoding]
+        if any(request.if_none_match.contains(entry.etag + suffix) for suffix in ENCODING_ETAG_SUFFIXES.values()):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+
+        response = Response(entry.encode(encoding) if encoding else body, mimetype=entry.mimetype)
+        response.set_etag(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
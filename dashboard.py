@@ -0,0 +1,207 @@
+import threading
+import time
+
+from availability import RoomAvailability, epoch_seconds
+from db import fetch_all
+
+
+def guest_full_name(guest):
+    guest = guest or {}
+    return f"{guest.get('first_name', '')} {guest.get('last_name', '')}".strip()
+
+
+class DashboardSnapshot:
+    """
+    In-process view of the rooms and bookings behind the staff dashboard.
+
+    Rooms come from the shared RoomCatalogue, so a status change made by
+    any worker shows up here at once. Bookings are loaded with one bulk
+    query and then kept current by the routes that change them, so
+    get_guest_bookings and get-room-status read them without any upstream
+    calls. Other workers (or direct database edits) can still change
+    bookings, so they are reloaded once older than reconcile_interval
+    seconds.
+
+    It also keeps every room's booked intervals as epoch seconds, parsed
+    once when a booking arrives, so book_room can check availability
+    without fetching and re-parsing bookings on every request.
+
+    Listeners added with add_listener() are told about every change as
+    (event, data): "room" with the room's status row, "booking" with the
+    booking's dashboard row, "booking_removed" with its id, and "snapshot"
+    with the full room status after a rebuild.
+    """
+
+    def __init__(self, client, catalogue, reconcile_interval=60):
+        self.client = client
+        self.catalogue = catalogue
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._bookings = {}
+        self._availability = RoomAvailability()
+        self._built_at = None
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _emit(self, event, data):
+        for listener in self._listeners:
+            listener(event, data)
+
+    # Reads
+    def guest_bookings(self):
+        self.ensure_fresh()
+        pending = []
+        checked_in = []
+        with self._lock:
+            for booking in self._bookings.values():
+                booking_data = self._booking_row(booking)
+                if booking['checkin_status']:
+                    checked_in.append(booking_data)
+                else:
+                    pending.append(booking_data)
+        return {'pending': pending, 'checkedIn': checked_in}
+
+    def room_status(self):
+        self.ensure_fresh()
+        return self._room_rows()
+
+    def _room_rows(self):
+        rooms = self.catalogue.rooms()
+        with self._lock:
+            active = {}
+            for booking in self._bookings.values():
+                if booking['checkin_status']:
+                    active.setdefault(booking['room_id'], booking)
+            return [self._room_row(room, active.get(room['room_id'])) for room in rooms]
+
+    def room_availability(self, room_ids):
+        """A private copy of the booked intervals of the given rooms."""
+        self.ensure_fresh()
+        with self._lock:
+            return self._availability.subset(room_ids)
+
+    def _active_booking(self, room_id):
+        for booking in self._bookings.values():
+            if booking['room_id'] == room_id and booking['checkin_status']:
+                return booking
+        return None
+
+    @staticmethod
+    def _room_row(room, booking):
+        room = dict(room)
+        room["id"] = room.get("room_id")
+        room["guestName"] = booking['guest_name'] if booking else ""
+        room["checkOutDate"] = booking.get('check_out_date', "") if booking else ""
+        return room
+
+    @staticmethod
+    def _booking_row(booking):
+        return {
+            'id': booking['reservation_id'],
+            'name': booking['guest_name'],
+            'checkInDate': booking['check_in_date'] if booking['checkin_status'] else "-",
+            'checkOutDate': booking['check_out_date'] if booking['checkin_status'] else "-"
+        }
+
+    # Incremental updates from the mutating routes
+    def booking_added(self, booking, guest_name):
+        entry = self._booking_entry(booking, guest_name)
+        with self._lock:
+            if self._built_at is not None:
+                self._bookings[booking['reservation_id']] = entry
+                self._add_interval(entry)
+        self._emit("booking", self._booking_row(entry))
+
+    def booking_updated(self, reservation_id, changes):
+        with self._lock:
+            booking = self._bookings.get(reservation_id)
+            if booking is None:
+                return
+            self._remove_interval(booking)
+            booking.update(changes)
+            self._add_interval(booking)
+            row = self._booking_row(booking)
+        self._emit("booking", row)
+
+    def booking_removed(self, reservation_id):
+        with self._lock:
+            booking = self._bookings.pop(reservation_id, None)
+            if booking is not None:
+                self._remove_interval(booking)
+        self._emit("booking_removed", {'id': reservation_id})
+
+    def room_updated(self, room_id, changes):
+        self.catalogue.update(room_id, changes)
+        room = self.catalogue.get(room_id)
+        if room is None:
+            return
+        with self._lock:
+            row = self._room_row(room, self._active_booking(room_id))
+        self._emit("room", row)
+
+    def _add_interval(self, booking):
+        self._availability.add(
+            booking['room_id'],
+            epoch_seconds(booking['check_in_date']),
+            epoch_seconds(booking['check_out_date']),
+        )
+
+    def _remove_interval(self, booking):
+        self._availability.remove(
+            booking['room_id'],
+            epoch_seconds(booking['check_in_date']),
+            epoch_seconds(booking['check_out_date']),
+        )
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    # Reconciliation
+    def _is_fresh(self):
+        built_at = self._built_at
+        return built_at is not None and time.monotonic() - built_at < self.reconcile_interval
+
+    def ensure_fresh(self):
+        if self._is_fresh():
+            return
+        # One thread rebuilds; the rest keep serving the stale copy, or
+        # wait for it when there is nothing to serve yet
+        if self._rebuild_lock.acquire(blocking=self._built_at is None):
+            try:
+                if not self._is_fresh():
+                    self.rebuild()
+            finally:
+                self._rebuild_lock.release()
+
+    def rebuild(self):
+        # Paged, since a snapshot missing bookings would offer taken rooms
+        bookings = fetch_all(lambda: self.client.table('room_booking')
+                             .select('*, guest(first_name, last_name)')
+                             .order('reservation_id'))
+
+        availability = RoomAvailability.from_bookings(bookings)
+        with self._lock:
+            self._availability = availability
+            self._bookings = {
+                booking['reservation_id']: self._booking_entry(booking, guest_full_name(booking.get('guest')))
+                for booking in bookings
+            }
+            self._built_at = time.monotonic()
+        if self._listeners:
+            self._emit("snapshot", self._room_rows())
+
+    @staticmethod
+    def _booking_entry(booking, guest_name):
+        return {
+            'reservation_id': booking['reservation_id'],
+            'room_id': booking['room_id'],
+            'user_id': booking.get('user_id'),
+            'check_in_date': booking['check_in_date'],
+            'check_out_date': booking['check_out_date'],
+            'checkin_status': booking.get('checkin_status', False),
+            'guest_name': guest_name,
+        }
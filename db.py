@@ -0,0 +1,246 @@
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+from postgrest.utils import SyncClient as PostgrestSession
+from supabase import AsyncClient, AsyncClientOptions, Client
+from supabase.lib.client_options import ClientOptions
+
+
+@dataclass
+class DataAccessSettings:
+    """Transport settings for every PostgREST call the app makes."""
+
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    retries: int = 2
+    pool_size: int = 20
+    keepalive_expiry: float = 30.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            timeout=float(os.getenv("SUPABASE_TIMEOUT", cls.timeout)),
+            connect_timeout=float(os.getenv("SUPABASE_CONNECT_TIMEOUT", cls.connect_timeout)),
+            retries=int(os.getenv("SUPABASE_RETRIES", cls.retries)),
+            pool_size=int(os.getenv("SUPABASE_POOL_SIZE", cls.pool_size)),
+            keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+        )
+
+    @property
+    def httpx_timeout(self):
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+    @property
+    def limits(self):
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+def table_from_path(path):
+    # /rest/v1/<table>?... or /rest/v1/rpc/<fn>
+    parts = path.split("/rest/v1/", 1)[-1].split("/")
+    return "/".join(parts[:2]) if parts[0] == "rpc" else parts[0]
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Reports method, table, status and duration of each call to observer."""
+
+    def __init__(self, transport, observer):
+        self.transport = transport
+        self.observer = observer
+
+    def handle_request(self, request):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = self.transport.handle_request(request)
+            status = response.status_code
+            return response
+        finally:
+            self.observer(request.method, table_from_path(request.url.path), status, time.perf_counter() - start)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport, observer):
+        self.transport = transport
+        self.observer = observer
+
+    async def handle_async_request(self, request):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.transport.handle_async_request(request)
+            status = response.status_code
+            return response
+        finally:
+            self.observer(request.method, table_from_path(request.url.path), status, time.perf_counter() - start)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class PooledClient(Client):
+    """
+    Sync Supabase client whose PostgREST sessions share one HTTP/2 transport.
+
+    supabase-py throws its PostgREST client away on every auth event, which
+    would also drop the open connections. Keeping the transport outside the
+    session means connections survive that and are reused across requests
+    and worker threads. Connection failures are retried by the transport,
+    which is safe for writes because the request never reached the server.
+    """
+
+    def __init__(self, supabase_url, supabase_key, options, settings, observer=None):
+        self.settings = settings
+        self.transport = httpx.HTTPTransport(
+            http2=True,
+            retries=settings.retries,
+            limits=settings.limits,
+        )
+        if observer is not None:
+            self.transport = InstrumentedTransport(self.transport, observer)
+        super().__init__(supabase_url, supabase_key, options)
+
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout, verify=True, proxy=None):
+        postgrest = Client._init_postgrest_client(rest_url, headers, schema, timeout, verify, proxy)
+        postgrest.session = PostgrestSession(
+            base_url=rest_url,
+            headers=postgrest.session.headers,
+            timeout=self.settings.httpx_timeout,
+            transport=self.transport,
+            follow_redirects=True,
+        )
+        return postgrest
+
+
+class PooledAsyncClient(AsyncClient):
+    """Async counterpart of PooledClient, used by AsyncDataAccess."""
+
+    def __init__(self, supabase_url, supabase_key, options, settings, observer=None):
+        self.settings = settings
+        self.transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=settings.retries,
+            limits=settings.limits,
+        )
+        if observer is not None:
+            self.transport = AsyncInstrumentedTransport(self.transport, observer)
+        super().__init__(supabase_url, supabase_key, options)
+
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout, verify=True, proxy=None):
+        postgrest = AsyncClient._init_postgrest_client(rest_url, headers, schema, timeout, verify, proxy)
+        postgrest.session = httpx.AsyncClient(
+            base_url=rest_url,
+            headers=postgrest.session.headers,
+            timeout=self.settings.httpx_timeout,
+            transport=self.transport,
+            follow_redirects=True,
+        )
+        return postgrest
+
+
+class AsyncDataAccess:
+    """
+    Async execution path for running independent queries concurrently.
+
+    Each worker process gets one event loop on a background thread and one
+    pooled async client. Sync Flask views hand it query factories and block
+    until all of them have finished, so N independent round-trips cost
+    roughly one.
+    """
+
+    def __init__(self, url, key, settings, observer=None):
+        self.url = url
+        self.key = key
+        self.settings = settings
+        self.observer = observer
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._pid = None
+
+    def run(self, *factories, return_exceptions=False):
+        """Run factory(client) coroutines concurrently; results keep their order."""
+        loop, client = self._ensure_started()
+
+        async def gather():
+            return await asyncio.gather(*(factory(client) for factory in factories), return_exceptions=True)
+
+        # Always wait for every call, so a failure is only raised once the
+        # others have settled and compensating writes cannot race them
+        results = asyncio.run_coroutine_threadsafe(gather(), loop).result()
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return results
+
+    def _ensure_started(self):
+        # Gunicorn forks workers, so each process needs its own loop
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop, self._client
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="supabase-async", daemon=True).start()
+                options = AsyncClientOptions(
+                    auto_refresh_token=False,
+                    persist_session=False,
+                    postgrest_client_timeout=self.settings.httpx_timeout,
+                )
+                self._client = PooledAsyncClient(self.url, self.key, options, self.settings, self.observer)
+                self._loop = loop
+                self._pid = os.getpid()
+        return self._loop, self._client
+
+
+def blocking(fn, *args, **kwargs):
+    """Wrap a blocking call (e.g. an auth admin call) for AsyncDataAccess.run."""
+    return lambda client: asyncio.to_thread(fn, *args, **kwargs)
+
+
+# PostgREST silently truncates a response at the project's max-rows
+# (1000 on Supabase), so whole-table loads page by this; keep it at or
+# below that setting
+PAGE_SIZE = int(os.getenv("SUPABASE_MAX_ROWS", 1000))
+
+
+def fetch_all(query, page_size=None):
+    """
+    Every row of a select, fetched page by page with range().
+
+    query() must build a fresh select ordered by a unique column, so pages
+    neither overlap nor skip rows; paging stops at the first short page.
+    """
+    page_size = page_size or PAGE_SIZE
+    rows = []
+    start = 0
+    while True:
+        page = query().range(start, start + page_size - 1).execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def create_data_access(url, key, settings=None, observer=None):
+    settings = settings or DataAccessSettings.from_env()
+    options = ClientOptions(
+        auto_refresh_token=False,
+        persist_session=False,
+        postgrest_client_timeout=settings.httpx_timeout,
+    )
+    return (
+        PooledClient(url, key, options, settings, observer),
+        AsyncDataAccess(url, key, settings, observer),
+    )
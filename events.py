@@ -0,0 +1,67 @@
+import json
+import queue
+import threading
+
+
+class Subscription:
+    def __init__(self, hub, max_buffer):
+        self.hub = hub
+        self.buffer = queue.Queue(maxsize=max_buffer)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next (event, data) pair, or None if nothing arrived in time."""
+        try:
+            return self.buffer.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """
+    In-process pub/sub for server-sent events.
+
+    Every subscriber has its own bounded buffer and publish() never blocks.
+    A subscriber whose buffer fills up is marked overflowed and dropped, so
+    one slow client cannot stall the routes or the other clients; it
+    reconnects and starts again from a fresh snapshot.
+    """
+
+    def __init__(self, max_subscribers=100, max_buffer=256):
+        self.max_subscribers = max_subscribers
+        self.max_buffer = max_buffer
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self, self.max_buffer)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.buffer.put_nowait((event, data))
+            except queue.Full:
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
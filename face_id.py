@@ -0,0 +1,377 @@
+import fcntl
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from db import fetch_all
+
+ID_BYTES = 36
+OP_REMOVE = 0
+OP_ENROL = 1
+RECORD_HEADER = struct.Struct(f"<B{ID_BYTES}sf")
+
+
+#Unit vector as int8 components plus the scale that restores them
+def quantise(vector):
+    peak = float(np.abs(vector).max())
+    scale = peak / 127 if peak else 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+class FaceGallery:
+    """
+    Face embeddings of guests who opted into facial ID, for kiosk matching.
+
+    Embeddings arrive precomputed from the client's face model and are
+    L2-normalised, then stored int8-quantised (one float32 scale per row)
+    in an index directory shared by every worker on the node:
+
+      CURRENT            generation number of the live files
+      ids-<g>.npy        user ids, sorted, so a row is found by bisection
+      vectors-<g>.npy    int8 rows in the same order
+      scales-<g>.npy     per-row scales
+      log-<g>.bin        enrolments and removals since the files were built
+
+    Workers memory-map the .npy files read-only, so the gallery lives once
+    in the page cache no matter how many workers there are, and starting a
+    worker costs a few mmap calls rather than a database load. Each worker
+    replays the small log on top: an enrolment masks the base row of that
+    guest and adds the new vector, and a removal (tombstone) masks it. A
+    removal is visible to the worker that made it at once and to the others
+    on their next match, since every match first checks the log for new
+    records.
+
+    Once the log holds compact_every records, or compact_interval seconds
+    have passed, one worker folds it into a new generation. Every
+    reconcile_interval it also drops guests who have withdrawn consent or
+    been deleted by other means. The database (face_embedding) stays the
+    source of truth; the directory is rebuilt from it whenever CURRENT is
+    missing, including when it is cleared while workers are running.
+    """
+
+    def __init__(self, client, path, dim=128, threshold=0.6, compact_every=1000,
+                 compact_interval=600, reconcile_interval=3600, block_bytes=1 << 20):
+        self.client = client
+        self.path = path
+        self.dim = dim
+        self.threshold = threshold
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self.reconcile_interval = reconcile_interval
+        # Rows are widened to float32 a block at a time; about 1 MiB per
+        # block keeps the temporary in cache
+        self.block_rows = max(64, block_bytes // (4 * dim))
+        self.record = struct.Struct(f"{RECORD_HEADER.format}{dim}b")
+        self._lock = threading.Lock()
+        self._compacting = threading.Event()
+        self._generation = None
+        self._reset(None, np.empty(0, f"S{ID_BYTES}"), np.empty((0, dim), np.int8), np.empty(0, np.float32))
+
+    def normalise(self, embedding):
+        """Embedding as a unit float32 vector; raises ValueError if unusable."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"embedding must have {self.dim} values")
+        norm = float(np.linalg.norm(vector))
+        if not np.isfinite(norm) or norm == 0:
+            raise ValueError("embedding must be a finite, non-zero vector")
+        return vector / norm
+
+    # Files
+    def _file(self, name, generation=None):
+        return os.path.join(self.path, name if generation is None else f"{name}-{generation}.{'bin' if name == 'log' else 'npy'}")
+
+    @contextmanager
+    def _file_lock(self):
+        # Serialises log appends, compaction and the first build across workers
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file("lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_generation(self):
+        try:
+            with open(self._file("CURRENT")) as current:
+                return int(current.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def _write_generation(self, generation, ids, vectors, scales):
+        for name, array in (("ids", ids), ("vectors", vectors), ("scales", scales)):
+            tmp = self._file(name, generation) + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, self._file(name, generation))
+        open(self._file("log", generation), "wb").close()
+
+        tmp = self._file("CURRENT") + ".tmp"
+        with open(tmp, "w") as current:
+            current.write(str(generation))
+        os.replace(tmp, self._file("CURRENT"))
+
+    def _locked_generation(self):
+        """CURRENT's generation, rebuilding from the database if it is missing. Hold the file lock."""
+        generation = self._read_generation()
+        if generation is None:
+            self._build_from_database()
+            generation = self._read_generation()
+        return generation
+
+    # Loading
+    def ensure_loaded(self):
+        if self._generation is not None:
+            return
+        if self._read_generation() is None:
+            with self._file_lock():
+                self._locked_generation()
+        with self._lock:
+            self._refresh()
+
+    def _build_from_database(self):
+        consenting = self._consenting_ids()
+        rows = fetch_all(lambda: self.client.table("face_embedding").select("user_id, embedding").order("user_id"))
+        entries = {}
+        for row in rows:
+            if row["user_id"] not in consenting:
+                continue
+            try:
+                entries[row["user_id"]] = quantise(self.normalise(row["embedding"]))
+            except ValueError as e:
+                print(f"Skipping face embedding for {row['user_id']}: {e}")
+        # A fresh number, so a worker still mapping files from before the
+        # directory was cleared never mistakes them for these
+        self._write_generation(time.time_ns() // 1000, *self._pack(entries))
+
+    def _consenting_ids(self):
+        rows = fetch_all(lambda: self.client.table("guest").select("user_id").eq("facialid_consent", True).order("user_id"))
+        return {row["user_id"] for row in rows}
+
+    def _pack(self, entries):
+        user_ids = sorted(entries)
+        ids = np.array([user_id.encode() for user_id in user_ids], dtype=f"S{ID_BYTES}")
+        vectors = np.zeros((len(user_ids), self.dim), dtype=np.int8)
+        scales = np.zeros(len(user_ids), dtype=np.float32)
+        for row, user_id in enumerate(user_ids):
+            vectors[row], scales[row] = entries[user_id]
+        return ids, vectors, scales
+
+    # Per-worker view: memory-mapped base plus the replayed log
+    def _reset(self, generation, ids, vectors, scales):
+        self._generation = generation
+        self._ids = ids
+        self._vectors = vectors
+        self._scales = scales
+        self._log_offset = 0
+        self._log_records = 0
+        self._masked = set()
+        self._masked_rows = np.empty(0, dtype=np.intp)
+        self._delta = {}
+        self._delta_matrix = None
+
+    def _load(self, name, generation):
+        return np.load(self._file(name, generation), mmap_mode="r")
+
+    def _refresh(self):
+        generation = self._read_generation()
+        while generation != self._generation:
+            if generation is None:
+                # The directory was cleared under us; rebuild it rather than spin
+                print("Face index is missing; rebuilding it from the database")
+                with self._file_lock():
+                    generation = self._locked_generation()
+                self._generation = None
+                continue
+            try:
+                ids, vectors, scales = (self._load(name, generation) for name in ("ids", "vectors", "scales"))
+            except FileNotFoundError:
+                # Compacted again between reading CURRENT and opening the files
+                generation = self._read_generation()
+                continue
+            self._reset(generation, ids, vectors, scales)
+
+        try:
+            size = os.path.getsize(self._file("log", generation))
+        except FileNotFoundError:
+            return
+        whole = (size - self._log_offset) // self.record.size * self.record.size
+        if whole <= 0:
+            return
+        with open(self._file("log", generation), "rb") as log:
+            log.seek(self._log_offset)
+            data = log.read(whole)
+        self._log_offset += whole
+        for op, raw_id, scale, *components in self.record.iter_unpack(data):
+            self._apply(op, raw_id.rstrip(b"\0").decode(), scale, components)
+
+    def _apply(self, op, user_id, scale, components):
+        self._log_records += 1
+        row = self._base_row(user_id)
+        if row is not None and row not in self._masked:
+            self._masked.add(row)
+            self._masked_rows = np.fromiter(self._masked, dtype=np.intp)
+        if op == OP_ENROL:
+            self._delta[user_id] = (np.array(components, dtype=np.float32) * scale)
+        else:
+            self._delta.pop(user_id, None)
+        self._delta_matrix = None
+
+    def _base_row(self, user_id):
+        key = user_id.encode()
+        row = int(np.searchsorted(self._ids, key))
+        if row < len(self._ids) and self._ids[row] == key:
+            return row
+        return None
+
+    # Changes
+    def _append(self, op, user_id, vector=None):
+        if len(user_id.encode()) > ID_BYTES:
+            raise ValueError(f"user ids longer than {ID_BYTES} bytes cannot be indexed")
+        if vector is None:
+            components, scale = np.zeros(self.dim, dtype=np.int8), 1.0
+        else:
+            components, scale = quantise(vector)
+        record = self.record.pack(op, user_id.encode(), scale, *components.tolist())
+        with self._file_lock():
+            generation = self._locked_generation()
+            with open(self._file("log", generation), "ab") as log:
+                log.write(record)
+        with self._lock:
+            self._refresh()
+            due = self._log_records >= self.compact_every
+        if due:
+            self.compact_in_background()
+
+    def enrol(self, user_id, vector):
+        self.ensure_loaded()
+        self._append(OP_ENROL, user_id, vector)
+
+    def remove(self, user_id):
+        """Tombstone a guest's face; takes effect before this returns."""
+        self.ensure_loaded()
+        self._append(OP_REMOVE, user_id)
+
+    # Matching
+    def _scores(self, vector):
+        count = len(self._ids)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.block_rows):
+            end = min(start + self.block_rows, count)
+            block = self._vectors[start:end].astype(np.float32) @ vector
+            scores[start:end] = block * self._scales[start:end]
+        scores[self._masked_rows] = -np.inf
+        return scores
+
+    def match(self, vector, k=5, threshold=None):
+        """Up to k (user_id, score) pairs at or above threshold, best first."""
+        self.ensure_loaded()
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            self._refresh()
+            candidates = []
+
+            scores = self._scores(vector)
+            if len(scores):
+                top = min(k, len(scores))
+                for row in np.argpartition(scores, len(scores) - top)[len(scores) - top:]:
+                    if scores[row] >= threshold:
+                        candidates.append((self._ids[row].decode(), float(scores[row])))
+
+            if self._delta:
+                if self._delta_matrix is None:
+                    self._delta_matrix = (list(self._delta), np.stack(list(self._delta.values())))
+                user_ids, matrix = self._delta_matrix
+                for user_id, score in zip(user_ids, (matrix @ vector).tolist()):
+                    if score >= threshold:
+                        candidates.append((user_id, score))
+
+            due = self._compaction_due()
+
+        if due:
+            self.compact_in_background()
+        candidates.sort(key=lambda match: match[1], reverse=True)
+        return candidates[:k]
+
+    def __len__(self):
+        self.ensure_loaded()
+        with self._lock:
+            self._refresh()
+            base = len(self._ids) - len(self._masked)
+            return base + len(self._delta)
+
+    # Compaction
+    def _compaction_due(self):
+        if not self._log_records:
+            return False
+        try:
+            age = time.time() - os.path.getmtime(self._file("CURRENT"))
+        except FileNotFoundError:
+            return False
+        return age >= self.compact_interval
+
+    def compact_in_background(self):
+        if self._compacting.is_set():
+            return
+        self._compacting.set()
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                print("Error compacting face index:", e)
+            finally:
+                self._compacting.clear()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def compact(self, reconcile=None):
+        """Fold the log into a new generation, dropping tombstoned rows."""
+        with self._file_lock():
+            generation = self._locked_generation()
+            if reconcile is None:
+                reconcile = time.time() - self._reconciled_at() >= self.reconcile_interval
+            consenting = self._consenting_ids() if reconcile else None
+
+            # A private replay of the whole log, independent of this worker's view
+            view = FaceGallery(self.client, self.path, self.dim)
+            view._refresh()
+            keep = np.ones(len(view._ids), dtype=bool)
+            keep[view._masked_rows] = False
+            if consenting is not None:
+                keep &= np.isin(view._ids, np.array([user_id.encode() for user_id in consenting], dtype=f"S{ID_BYTES}"))
+
+            entries = {
+                user_id: quantise(vector)
+                for user_id, vector in view._delta.items()
+                if consenting is None or user_id in consenting
+            }
+            ids = np.concatenate([view._ids[keep], np.array([u.encode() for u in entries], dtype=f"S{ID_BYTES}")])
+            vectors = np.concatenate([view._vectors[keep], np.array([c for c, _ in entries.values()], dtype=np.int8).reshape(-1, self.dim)])
+            scales = np.concatenate([view._scales[keep], np.array([s for _, s in entries.values()], dtype=np.float32)])
+            order = np.argsort(ids, kind="stable")
+
+            self._write_generation(generation + 1, ids[order], vectors[order], scales[order])
+            if reconcile:
+                open(self._file("reconciled"), "w").close()
+
+            # Workers still mapping the old files keep them alive until they remap
+            for name in ("ids", "vectors", "scales", "log"):
+                try:
+                    os.remove(self._file(name, generation))
+                except FileNotFoundError:
+                    pass
+
+        with self._lock:
+            self._refresh()
+
+    def _reconciled_at(self):
+        try:
+            return os.path.getmtime(self._file("reconciled"))
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,479 @@
+"""
+In-memory stand-in for the parts of the Supabase client that app.py uses.
+
+Set SUPABASE_BACKEND=memory before importing app to run every route against
+it, e.g. for benchmark.py. Each execute() can sleep for an injected latency
+to mimic a PostgREST round-trip, and every call is counted per table. Like
+PostgREST with max-rows set, a select returns at most max_rows rows
+(1000, Supabase's default) and drops the rest without saying so.
+"""
+import asyncio
+import itertools
+import secrets
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from postgrest import APIError, APIResponse
+
+from auth import encode_hs256
+from availability import parse_utc
+
+# Columns filled in on insert when the caller leaves them out
+AUTO_KEYS = {
+    "room": "room_id",
+    "room_booking": "reservation_id",
+    "cicologs": "id",
+    "blacklist": "id",
+}
+
+# Column defaults the real schema fills in
+DEFAULTS = {
+    "room_booking": {"checkin_status": False},
+}
+
+# Conflict columns used by upsert
+PRIMARY_KEYS = {
+    "room": "room_id",
+    "room_booking": "reservation_id",
+    "guest": "user_id",
+    "profiles": "id",
+    "employee": "id",
+    "room_preferences": "user_id",
+    "cicologs": "id",
+    "blacklist": "id",
+    "face_embedding": "user_id",
+}
+
+# Exclusion constraints: table -> (group column, range start, range end),
+# mirroring room_booking_no_overlap in supabase/migrations
+EXCLUSIONS = {
+    "room_booking": ("room_id", "check_in_date", "check_out_date"),
+}
+
+# Many-to-one embeds: (table, embedded table) -> (local column, foreign column)
+RELATIONS = {
+    ("room_booking", "guest"): ("user_id", "user_id"),
+    ("room_booking", "room"): ("room_id", "room_id"),
+}
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+def split_columns(columns):
+    """Split a select string on top-level commas."""
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+# Operators understood inside or=/and= filter strings
+LOGIC_OPERATORS = {
+    "eq": lambda v, x: v == x,
+    "neq": lambda v, x: v != x,
+    "lt": lambda v, x: v is not None and v < x,
+    "lte": lambda v, x: v is not None and v <= x,
+    "gt": lambda v, x: v is not None and v > x,
+    "gte": lambda v, x: v is not None and v >= x,
+}
+
+
+def parse_logic(kind, filters):
+    """Row test for a PostgREST logic filter like 'a.lt.1,and(a.eq.1,b.lt."x")'."""
+    tests = []
+    for part in split_columns(filters):
+        if part.startswith(("and(", "or(")):
+            inner_kind, inner = part.split("(", 1)
+            tests.append(parse_logic(inner_kind, inner[:-1]))
+            continue
+        column, operator, value = part.split(".", 2)
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        tests.append(lambda row, column=column, op=LOGIC_OPERATORS[operator], value=value: op(row.get(column), value))
+    combine = any if kind == "or" else all
+    return lambda row: combine(test(row) for test in tests)
+
+
+def order_key(columns):
+    """Sort key over columns with NULLs last, spelled out for the usual one or two columns."""
+    if len(columns) == 1:
+        column, = columns
+        return lambda row: (row.get(column) is None, row.get(column))
+    if len(columns) == 2:
+        first, second = columns
+        return lambda row: (row.get(first) is None, row.get(first), row.get(second) is None, row.get(second))
+    return lambda row: tuple(part for column in columns for part in (row.get(column) is None, row.get(column)))
+
+
+class FakeQuery:
+    def __init__(self, backend, table):
+        self.backend = backend
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.payload = None
+        self.filters = []
+        self.ordering = []
+        self.bounds = None
+        self.want_single = False
+
+    # Actions
+    def select(self, *columns, count=None):
+        self.action = "select"
+        self.columns = ",".join(columns) if columns else "*"
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **kwargs):
+        self.action, self.payload = "upsert", payload
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, payload, **kwargs):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    # Filters
+    def _filter(self, column, test):
+        self.filters.append((column, test))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._filter(column, lambda v: v in values)
+
+    def is_(self, column, value):
+        return self._filter(column, lambda v: v is None if value in (None, "null") else v == value)
+
+    def or_(self, filters, reference_table=None):
+        test = parse_logic("or", filters)
+        self.filters.append((None, test))
+        return self
+
+    # Modifiers
+    def order(self, column, desc=False, **kwargs):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count, **kwargs):
+        self.bounds = (0, count)
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.bounds = (start, end - start + 1)
+        return self
+
+    def single(self):
+        self.want_single = True
+        return self
+
+    def execute(self):
+        return self.backend.execute(self)
+
+
+class AsyncFakeQuery(FakeQuery):
+    async def execute(self):
+        return await self.backend.execute_async(self)
+
+
+class FakeAdmin:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create_user(self, attributes):
+        return self.backend.create_auth_user(attributes)
+
+    def update_user_by_id(self, user_id, attributes):
+        self.backend.count_call("auth", "PUT")
+        with self.backend.lock:
+            user = self.backend.users.get(user_id)
+            if user is None:
+                raise FakeAPIError("User not found")
+            user.update(attributes)
+        return SimpleNamespace(user=SimpleNamespace(id=user_id))
+
+    def delete_user(self, user_id):
+        self.backend.count_call("auth", "DELETE")
+        with self.backend.lock:
+            self.backend.users.pop(user_id, None)
+
+
+class FakeAuth:
+    def __init__(self, backend):
+        self.backend = backend
+        self.admin = FakeAdmin(backend)
+
+    def sign_up(self, credentials):
+        return self.backend.create_auth_user(credentials)
+
+    def get_user(self, access_token):
+        self.backend.count_call("auth", "GET")
+        user_id = self.backend.tokens.get(access_token)
+        if user_id is None:
+            raise FakeAPIError("Invalid token")
+        return SimpleNamespace(user=SimpleNamespace(id=user_id))
+
+
+class FakeSupabase:
+    """Sync client facade: table(), auth and auth.admin."""
+
+    def __init__(self, backend, query_class=FakeQuery):
+        self.backend = backend
+        self.query_class = query_class
+        self.auth = FakeAuth(backend)
+
+    def table(self, name):
+        return self.query_class(self.backend, name)
+
+
+class FakeAsyncDataAccess:
+    """Drop-in for db.AsyncDataAccess backed by the same in-memory tables."""
+
+    def __init__(self, backend):
+        self.client = FakeSupabase(backend, AsyncFakeQuery)
+
+    def run(self, *factories, return_exceptions=False):
+        async def gather():
+            return await asyncio.gather(*(factory(self.client) for factory in factories), return_exceptions=True)
+
+        results = asyncio.run(gather())
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return results
+
+
+class FakeBackend:
+    def __init__(self, latency=0.0, observer=None, max_rows=1000):
+        self.latency = latency
+        self.max_rows = max_rows
+        self.observer = observer
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.users = {}
+        self.tokens = {}
+        self.jwt_secret = secrets.token_hex(32)
+        self.calls = {}
+        self._ids = {}
+
+    # Bookkeeping
+    def count_call(self, table, method):
+        with self.lock:
+            self.calls[table] = self.calls.get(table, 0) + 1
+        if self.observer is not None:
+            self.observer(method, table, 200, self.latency)
+
+    def total_calls(self):
+        with self.lock:
+            return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls.clear()
+
+    def seed(self, table, rows):
+        with self.lock:
+            for row in rows:
+                self._insert_row(table, dict(row))
+
+    def rows(self, table):
+        with self.lock:
+            return [dict(row) for row in self.tables.get(table, [])]
+
+    def create_auth_user(self, attributes):
+        self.count_call("auth", "POST")
+        user_id = str(uuid.uuid4())
+        with self.lock:
+            self.users[user_id] = dict(attributes)
+        return SimpleNamespace(user=SimpleNamespace(id=user_id), session=None)
+
+    def issue_token(self, user_id, expires_in=3600, **claims):
+        now = int(time.time())
+        token = encode_hs256({
+            "sub": user_id,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "iat": now,
+            "exp": now + expires_in,
+            **claims,
+        }, self.jwt_secret)
+        self.tokens[token] = user_id
+        return token
+
+    # Execution
+    def execute(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._run(query)
+
+    async def execute_async(self, query):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._run(query)
+
+    def _run(self, query):
+        method = {"select": "GET", "insert": "POST", "upsert": "POST", "update": "PATCH", "delete": "DELETE"}[query.action]
+        self.count_call(query.table, method)
+        with self.lock:
+            data = getattr(self, "_" + query.action)(query)
+        if query.want_single:
+            if len(data) != 1:
+                raise FakeAPIError(f"Expected one row, got {len(data)}")
+            data = data[0]
+        return APIResponse(data=data, count=None)
+
+    def _next_id(self, table):
+        counter = self._ids.setdefault(table, itertools.count(1))
+        return next(counter)
+
+    def _insert_row(self, table, row):
+        auto_key = AUTO_KEYS.get(table)
+        if auto_key and row.get(auto_key) is None:
+            row[auto_key] = self._next_id(table)
+        elif auto_key and isinstance(row[auto_key], int):
+            # Keep the sequence ahead of explicitly seeded ids
+            counter = self._ids.setdefault(table, itertools.count(1))
+            self._ids[table] = itertools.count(max(next(counter), row[auto_key] + 1))
+        for column, value in DEFAULTS.get(table, {}).items():
+            row.setdefault(column, value)
+        row.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def _matching(self, query):
+        rows = self.tables.get(query.table, [])
+        return [
+            row for row in rows
+            if all(test(row) if column is None else test(row.get(column)) for column, test in query.filters)
+        ]
+
+    def _project(self, table, row, columns, indexes):
+        result = {}
+        for part in split_columns(columns):
+            if "(" in part:
+                name, inner = part.split("(", 1)
+                name = name.split("!")[0].strip()
+                local, foreign = RELATIONS[(table, name)]
+                index = indexes.get((name, foreign))
+                if index is None:
+                    index = indexes[(name, foreign)] = {other.get(foreign): other for other in self.tables.get(name, [])}
+                match = index.get(row.get(local))
+                result[name] = self._project(name, match, inner[:-1], indexes) if match is not None else None
+            elif part == "*":
+                result.update(row)
+            else:
+                result[part] = row.get(part)
+        return result
+
+    def _select(self, query):
+        rows = self._matching(query)
+        # One stable sort per run of columns sharing a direction, last run first
+        runs = []
+        for column, desc in query.ordering:
+            if runs and runs[-1][1] == desc:
+                runs[-1][0].append(column)
+            else:
+                runs.append(([column], desc))
+        for columns, desc in reversed(runs):
+            rows = sorted(rows, key=order_key(columns), reverse=desc)
+        if query.bounds:
+            start, count = query.bounds
+            rows = rows[start:start + count]
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows]
+        indexes = {}
+        return [self._project(query.table, row, query.columns, indexes) for row in rows]
+
+    def _check_exclusion(self, table, candidates, ignore=()):
+        """Raise like Postgres (23P01) if candidates overlap each other or stored rows."""
+        constraint = EXCLUSIONS.get(table)
+        if constraint is None:
+            return
+        group, start, end = constraint
+        ignore = {id(row) for row in ignore}
+        taken = [row for row in self.tables.get(table, []) if id(row) not in ignore]
+        for row in candidates:
+            row_start, row_end = parse_utc(row[start]), parse_utc(row[end])
+            for other in taken:
+                if other.get(group) == row.get(group) and \
+                        row_start < parse_utc(other[end]) and row_end > parse_utc(other[start]):
+                    raise APIError({
+                        "code": "23P01",
+                        "message": f'conflicting key value violates exclusion constraint "{table}_no_overlap"',
+                    })
+            taken.append(row)
+
+    def _insert(self, query):
+        payload = query.payload if isinstance(query.payload, list) else [query.payload]
+        self._check_exclusion(query.table, payload)
+        return [dict(self._insert_row(query.table, dict(row))) for row in payload]
+
+    def _upsert(self, query):
+        key = getattr(query, "on_conflict", None) or PRIMARY_KEYS.get(query.table)
+        payload = query.payload if isinstance(query.payload, list) else [query.payload]
+        written = []
+        for row in payload:
+            existing = next((r for r in self.tables.get(query.table, []) if key and r.get(key) == row.get(key)), None)
+            if existing is not None:
+                existing.update(row)
+                written.append(dict(existing))
+            else:
+                written.append(dict(self._insert_row(query.table, dict(row))))
+        return written
+
+    def _update(self, query):
+        rows = self._matching(query)
+        self._check_exclusion(query.table, [{**row, **query.payload} for row in rows], ignore=rows)
+        for row in rows:
+            row.update(query.payload)
+        return [dict(row) for row in rows]
+
+    def _delete(self, query):
+        rows = self._matching(query)
+        doomed = {id(row) for row in rows}
+        self.tables[query.table] = [row for row in self.tables.get(query.table, []) if id(row) not in doomed]
+        return [dict(row) for row in rows]
+
+
+def create_memory_backend(latency=0.0, observer=None, max_rows=1000):
+    """Return (backend, sync client, async data access) sharing one store."""
+    backend = FakeBackend(latency=latency, observer=observer, max_rows=max_rows)
+    return backend, FakeSupabase(backend), FakeAsyncDataAccess(backend)
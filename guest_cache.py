@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class GuestProfileCache:
+    """
+    Bounded LRU cache of guest rows keyed by user_id, with a TTL.
+
+    Routes that change a guest row call invalidate() so the next read goes
+    back to the database. Hit, miss and eviction counts are kept so the
+    size and TTL can be tuned.
+    """
+
+    def __init__(self, client, max_size=1024, ttl=300):
+        self.client = client
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        response = self.client.table("guest").select("*").eq("user_id", user_id).execute()
+        if not response.data:
+            return None
+
+        guest = response.data[0]
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, guest)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return guest
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,11 @@
+import os
+
+# Threaded workers let one process serve many requests while others wait
+# on Supabase; all threads share the pooled transport in db.py.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# app.py reads GUNICORN_THREADS too: each /stream/room-status connection
+# holds a thread, so it only allows a quarter of them to stream (2 per
+# worker by default)
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
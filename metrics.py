@@ -0,0 +1,154 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Per-process counters and histograms rendered in Prometheus text format.
+
+    Each gunicorn worker keeps its own registry; Prometheus sums the series
+    across scrapes of each worker. Observations are a dict lookup and a
+    bisect under one lock, so recording on the hot path stays cheap.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collector):
+        """Register a callable returning (name, labels, value) gauge samples."""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        seen = set()
+
+        def header(name):
+            if name not in seen and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+            seen.add(name)
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name)
+                lines.append(f"{name}{format_labels(labels)} {value}")
+
+            for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                header(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                header(name)
+                lines.append(f"{name}{format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+registry.describe("http_requests_total", "counter", "Requests handled, by route, method and status.")
+registry.describe("http_request_duration_seconds", "histogram", "Request latency by route and method.")
+registry.describe("upstream_requests_total", "counter", "Supabase calls by table, method and status.")
+registry.describe("upstream_request_duration_seconds", "histogram", "Supabase call latency by table and method.")
+registry.describe("upstream_errors_total", "counter", "Supabase calls that failed or returned a 4xx/5xx.")
+
+
+def observe_upstream(method, table, status, duration):
+    """Callback for the instrumented transports in db.py."""
+    labels = (("table", table), ("method", method))
+    registry.inc("upstream_requests_total", labels + (("status", str(status)),))
+    registry.observe("upstream_request_duration_seconds", labels, duration)
+    if status == "error" or int(status) >= 400:
+        registry.inc("upstream_errors_total", labels)
+
+
+def init_app(app):
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def note_response(response):
+        # Measured here so a streamed body's lifetime is not counted as latency
+        if "metrics_start" in g:
+            g.metrics_status = response.status_code
+            g.metrics_elapsed = time.perf_counter() - g.metrics_start
+        return response
+
+    #Recorded at teardown, which also runs when the view raised and no
+    #after_request hook saw a response, so those failures count as 500s
+    @app.teardown_request
+    def record_request(exc):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        status = g.pop("metrics_status", None)
+        elapsed = g.pop("metrics_elapsed", None)
+        if status is None or exc is not None:
+            status = 500
+        if elapsed is None:
+            elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        labels = (("route", route), ("method", request.method))
+        registry.observe("http_request_duration_seconds", labels, elapsed)
+        registry.inc("http_requests_total", labels + (("status", str(status)),))
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,213 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from db import fetch_all
+
+COLUMNS = ("room_id", "room_number", "room_type", "status")
+# Live generation and when its rows were last read from the database
+COUNTER = struct.Struct("<Qd")
+
+
+#Record dtype wide enough for rows: int64 for all-integer columns, else UTF-8 bytes
+def record_dtype(rows):
+    fields = []
+    for column in COLUMNS:
+        values = [row.get(column) for row in rows]
+        if values and all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            fields.append((column, "<i8"))
+        else:
+            width = max([len(str(value).encode()) for value in values if value is not None] + [1])
+            fields.append((column, f"S{width}"))
+    return np.dtype(fields)
+
+
+def pack_rooms(rows):
+    dtype = record_dtype(rows)
+    records = np.zeros(len(rows), dtype=dtype)
+    for i, row in enumerate(rows):
+        records[i] = tuple(
+            row.get(column) if dtype[column].kind == "i" else str(row.get(column) if row.get(column) is not None else "").encode()
+            for column in COLUMNS
+        )
+    return records
+
+
+def unpack_rooms(records):
+    decode = [dtype.kind == "S" for dtype, _ in (records.dtype.fields[column] for column in COLUMNS)]
+    return [
+        {column: value.decode() if is_bytes else value for column, value, is_bytes in zip(COLUMNS, values, decode)}
+        for values in records.tolist()
+    ]
+
+
+#Values as they are stored in a column, for comparing against the records
+def stored_values(records, column, values):
+    if records.dtype[column].kind == "S":
+        return [str(value).encode() for value in values]
+    return [value for value in values if isinstance(value, int)]
+
+
+class RoomCatalogue:
+    """
+    The room table (room_id, room_number, room_type, status), shared by
+    every worker on the node through one memory-mapped record array.
+
+    The directory at path holds:
+
+      generation         16 bytes mapped by every worker: the live
+                         generation and when its rows came from the database
+      rooms-<g>.npy      the rooms of generation g as fixed-width records
+      lock               flock taken by builds and writes
+
+    A read checks the mapped counter (no syscall) and only remaps when
+    another worker has moved it on, so the catalogue sits once in the page
+    cache and book_room and get-room-status read it without a query.
+
+    update() is the write path: under the lock it copies the live records
+    with the change applied into the next generation's file, then moves the
+    counter, so readers see either the old file or the new one and never a
+    half-written row. invalidate() moves the counter without a file, and
+    the first reader of that generation rebuilds it from the database while
+    the rest wait on the lock. A generation older than max_age is
+    invalidated the same way, which picks up rooms edited outside the app.
+    """
+
+    def __init__(self, client, path, max_age=300):
+        self.client = client
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._counter = None
+        self._generation = None
+        self._records = None
+
+    # Files
+    def _file(self, name, generation=None):
+        return os.path.join(self.path, name if generation is None else f"{name}-{generation}.npy")
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._file("lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open_counter(self):
+        if self._counter is not None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with self._file_lock():
+            with open(self._file("generation"), "a+b") as counter_file:
+                if os.path.getsize(self._file("generation")) < COUNTER.size:
+                    counter_file.write(COUNTER.pack(1, 0.0))
+                    counter_file.flush()
+                self._counter = mmap.mmap(counter_file.fileno(), COUNTER.size)
+
+    def _read_counter(self):
+        return COUNTER.unpack_from(self._counter, 0)
+
+    def _write_counter(self, generation, built_at):
+        COUNTER.pack_into(self._counter, 0, generation, built_at)
+
+    def _write_records(self, generation, records):
+        tmp = self._file("rooms", generation) + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, records)
+        os.replace(tmp, self._file("rooms", generation))
+
+        # Workers still mapping older files keep them alive until they remap
+        for name in os.listdir(self.path):
+            if name.startswith("rooms-") and name.endswith(".npy") and name != f"rooms-{generation}.npy":
+                os.remove(os.path.join(self.path, name))
+
+    # Reads
+    def generation(self):
+        """The live generation; changes whenever any worker changes a room."""
+        self._open_counter()
+        return self._read_counter()[0]
+
+    def _current(self):
+        self._open_counter()
+        generation, built_at = self._read_counter()
+        if built_at and time.time() - built_at >= self.max_age:
+            self._expire(generation)
+            generation, _ = self._read_counter()
+        if generation == self._generation:
+            return self._records
+
+        with self._lock:
+            while generation != self._generation:
+                try:
+                    records = np.load(self._file("rooms", generation), mmap_mode="r")
+                except FileNotFoundError:
+                    # Invalidated (or superseded again) since the counter was read
+                    self._build(generation)
+                    generation, _ = self._read_counter()
+                    continue
+                self._generation, self._records = generation, records
+            return self._records
+
+    def _build(self, generation):
+        with self._file_lock():
+            if self._read_counter()[0] != generation or os.path.exists(self._file("rooms", generation)):
+                return
+            rows = fetch_all(lambda: self.client.table("room").select(", ".join(COLUMNS)).order("room_id"))
+            self._write_records(generation, pack_rooms(rows))
+            self._write_counter(generation, time.time())
+
+    def _expire(self, generation):
+        with self._file_lock():
+            current, built_at = self._read_counter()
+            if current == generation and built_at and time.time() - built_at >= self.max_age:
+                self._write_counter(generation + 1, 0.0)
+
+    def rooms(self):
+        """Every room as a dict, in room_id order."""
+        return unpack_rooms(self._current())
+
+    def of_type(self, room_type):
+        """Rooms of one type; only the matching records are decoded."""
+        return self.of_types([room_type])
+
+    def of_types(self, room_types):
+        records = self._current()
+        return unpack_rooms(records[np.isin(records["room_type"], stored_values(records, "room_type", room_types))])
+
+    def get(self, room_id):
+        records = self._current()
+        match = records[np.isin(records["room_id"], stored_values(records, "room_id", [room_id]))]
+        return unpack_rooms(match)[0] if len(match) else None
+
+    # Writes
+    def update(self, room_id, changes):
+        """Publish a change already written to the room table to every worker."""
+        changes = {column: value for column, value in changes.items() if column in COLUMNS}
+        self._open_counter()
+        with self._file_lock():
+            generation, built_at = self._read_counter()
+            try:
+                rows = unpack_rooms(np.load(self._file("rooms", generation), mmap_mode="r"))
+            except FileNotFoundError:
+                # Not built since the last invalidation; the next read loads the change
+                return
+            for row in rows:
+                if row["room_id"] == room_id:
+                    row.update(changes)
+            self._write_records(generation + 1, pack_rooms(rows))
+            self._write_counter(generation + 1, built_at)
+
+    def invalidate(self):
+        """Make the next read, in any worker, reload the rooms from the database."""
+        self._open_counter()
+        with self._file_lock():
+            generation, _ = self._read_counter()
+            self._write_counter(generation + 1, 0.0)
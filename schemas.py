@@ -0,0 +1,150 @@
+from datetime import datetime, timezone
+from typing import Annotated, Any, Optional
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, StringConstraints, model_validator
+import pydantic_core
+
+
+#Stored timestamps are UTC; naive input is taken to already be UTC
+def _as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+UtcDatetime = Annotated[datetime, AfterValidator(_as_utc)]
+RequiredStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+
+class RequestModel(BaseModel):
+    model_config = ConfigDict(extra="ignore", populate_by_name=True, frozen=True)
+
+
+class StayDates(RequestModel):
+    check_in_date: UtcDatetime
+    check_out_date: UtcDatetime
+
+    @model_validator(mode="after")
+    def _check_order(self):
+        if self.check_in_date >= self.check_out_date:
+            raise ValueError("Check-out must be after check-in")
+        return self
+
+
+class BookingItem(StayDates):
+    user_id: Optional[RequiredStr] = None
+    room_type: RequiredStr
+    extra_towels: bool = Field(False, alias="ExtraTowels")
+    room_service: bool = Field(False, alias="RoomService")
+    spa_access: bool = Field(False, alias="SpaAccess")
+    airport_pickup: bool = Field(False, alias="AirportPickup")
+    late_checkout: bool = Field(False, alias="LateCheckout")
+
+    def amenities(self):
+        """Amenity flags as room_booking columns."""
+        return self.model_dump(include={"extra_towels", "room_service", "spa_access", "airport_pickup", "late_checkout"})
+
+
+class BookingRequest(BookingItem):
+    user_id: RequiredStr
+
+
+class BulkBookingRequest(RequestModel):
+    # Items are validated one by one so each gets its own result
+    user_id: Optional[RequiredStr] = None
+    items: list[Any] = Field(min_length=1)
+
+
+class BookingEdit(StayDates):
+    pass
+
+
+class PreferenceFeatures(RequestModel):
+    extra_pillows: bool = Field(False, alias="extraPillows")
+    extra_beds: bool = Field(False, alias="extraBeds")
+    extra_towels: bool = Field(False, alias="extraTowels")
+    early_check_in: bool = Field(False, alias="earlyCheckIn")
+
+
+class Preferences(RequestModel):
+    bed_type: Optional[str] = Field(None, alias="bedType")
+    room_view: Optional[str] = Field(None, alias="roomView")
+    floor_preference: Optional[str] = Field(None, alias="floorPreference")
+    additional_features: PreferenceFeatures = Field(default_factory=PreferenceFeatures, alias="additionalFeatures")
+
+
+class PreferencesRequest(RequestModel):
+    user_id: RequiredStr
+    preferences: Preferences
+
+
+class UserUpdate(RequestModel):
+    user_id: RequiredStr
+    first_name: RequiredStr
+    last_name: RequiredStr
+    mobile_number: RequiredStr
+    email: RequiredStr
+    facialid_consent: Optional[bool] = None
+
+
+class FaceEnrolment(RequestModel):
+    user_id: RequiredStr
+    embedding: list[float]
+
+
+class FaceMatchRequest(RequestModel):
+    embedding: list[float]
+    k: int = Field(5, ge=1, le=50)
+    threshold: Optional[float] = Field(None, ge=-1, le=1)
+
+
+class StaffEdit(RequestModel):
+    email: RequiredStr
+    password: Optional[str] = None
+
+
+#Validate the request body straight from its raw bytes
+def parse_request(model):
+    return model.model_validate_json(request.get_data() or b"{}")
+
+
+#One human-readable line per validation error
+def validation_messages(error):
+    messages = []
+    for detail in error.errors(include_url=False):
+        field = ".".join(str(part) for part in detail["loc"])
+        if detail["type"] == "missing":
+            messages.append(f"Missing required field: {field}")
+        elif detail["type"] == "json_invalid":
+            messages.append("Request body must be valid JSON")
+        elif field:
+            messages.append(f"{field}: {detail['msg']}")
+        else:
+            messages.append(detail["msg"].removeprefix("Value error, "))
+    return messages
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() through pydantic-core's Rust serialiser.
+
+    It is several times faster than the standard json module on the large
+    list responses (logs, room status). Types it does not know fall back to
+    Flask's default handling.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return pydantic_core.to_json(obj, fallback=self.default).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return pydantic_core.from_json(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            pydantic_core.to_json(obj, fallback=self.default),
+            mimetype=self.mimetype,
+        )
+
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time and shares its result.
+
+    The first caller for a key runs fn; callers that arrive with the same
+    key while it is running wait for it and get the same result (or the
+    same exception) instead of repeating the work. With window > 0 a
+    finished result also answers identical calls for that many seconds
+    afterwards; failures are never kept.
+
+    Calls are counted per group (the route, for the listing routes) as
+    executed, coalesced (waited on a running call) or windowed (answered
+    from a finished one), so the coalescing ratio can be exported.
+    """
+
+    def __init__(self, window=0.0, max_entries=256):
+        self.window = window
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._recent = OrderedDict()
+        self._counts = {}
+
+    def do(self, group, key, fn):
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None:
+                if time.monotonic() - recent[0] < self.window:
+                    self._count(group, "windowed")
+                    return recent[1]
+                del self._recent[key]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+            self._count(group, "executed" if leader else "coalesced")
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if self.window > 0 and flight.error is None:
+                    self._remember(key, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def _count(self, group, outcome):
+        counts = self._counts.setdefault(group, {"executed": 0, "coalesced": 0, "windowed": 0})
+        counts[outcome] += 1
+
+    def _remember(self, key, result):
+        now = time.monotonic()
+        self._recent[key] = (now, result)
+        self._recent.move_to_end(key)
+        while self._recent:
+            oldest_key, (finished, _) = next(iter(self._recent.items()))
+            if len(self._recent) <= self.max_entries and now - finished < self.window:
+                break
+            del self._recent[oldest_key]
+
+    def stats(self):
+        """{group: {"executed", "coalesced", "windowed"}} since start."""
+        with self._lock:
+            return {group: dict(counts) for group, counts in self._counts.items()}
@@ -0,0 +1,113 @@
+"""
+Concurrent booking stress run against the in-memory Supabase stand-in.
+
+    python stress_booking.py --rooms 5 --requests 400 --concurrency 32
+
+Fires overlapping book_room, book_rooms_bulk and edit_booking calls at a
+handful of rooms with injected latency, so every request races others
+between its availability read and its write. Then it scans room_booking
+for overlapping stays and exits non-zero if it finds any.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from availability import parse_utc
+
+
+def find_double_bookings(bookings):
+    by_room = {}
+    for booking in bookings:
+        by_room.setdefault(booking["room_id"], []).append(
+            (parse_utc(booking["check_in_date"]), parse_utc(booking["check_out_date"]), booking["reservation_id"])
+        )
+
+    overlaps = []
+    for room_id, stays in by_room.items():
+        stays.sort()
+        for (_, end, first), (start, _, second) in zip(stays, stays[1:]):
+            if start < end:
+                overlaps.append((room_id, first, second))
+    return overlaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.005, help="injected seconds per upstream call")
+    parser.add_argument("--rooms", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--days", type=int, default=30, help="width of the date window stays fall in")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ["SUPABASE_BACKEND"] = "memory"
+    os.environ["SUPABASE_MEMORY_LATENCY"] = str(args.latency)
+    import app as app_module
+
+    backend = app_module.memory_backend
+    backend.seed("room", [
+        {"room_id": i + 1, "room_number": 100 + i, "room_type": "Standard", "status": "Available"}
+        for i in range(args.rooms)
+    ])
+    backend.seed("guest", [{"user_id": "stress", "first_name": "Stress", "last_name": "Test", "email": "stress@example.com"}])
+
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+    local = threading.local()
+    outcomes = Counter()
+    outcome_lock = threading.Lock()
+    start = datetime(2026, 1, 1)
+
+    def stay():
+        with rng_lock:
+            check_in = start + timedelta(days=rng.randint(0, args.days))
+            nights = rng.randint(1, 4)
+            action = rng.random()
+            reservation = rng.randint(1, max(1, args.requests // 2))
+        return action, reservation, check_in, check_in + timedelta(days=nights)
+
+    def one(_):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app_module.app.test_client()
+        action, reservation, check_in, check_out = stay()
+        dates = {"check_in_date": check_in.isoformat(), "check_out_date": check_out.isoformat()}
+        if action < 0.6:
+            kind = "book_room"
+            response = client.post("/book_room", json={"user_id": "stress", "room_type": "Standard", **dates})
+        elif action < 0.8:
+            kind = "book_rooms_bulk"
+            item = {"room_type": "Standard", **dates}
+            response = client.post("/book_rooms_bulk", json={"user_id": "stress", "items": [item, item]})
+        else:
+            kind = "edit_booking"
+            response = client.put(f"/edit_booking/{reservation}", json=dates)
+        with outcome_lock:
+            outcomes[(kind, response.status_code)] += 1
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(one, range(args.requests)))
+
+    bookings = backend.rows("room_booking")
+    overlaps = find_double_bookings(bookings)
+
+    for (kind, status), count in sorted(outcomes.items()):
+        print(f"{kind:<18}{status:>5}{count:>7}")
+    print(f"bookings stored: {len(bookings)}")
+    print(f"double bookings: {len(overlaps)}")
+    for room_id, first, second in overlaps[:10]:
+        print(f"  room {room_id}: reservations {first} and {second} overlap")
+    sys.exit(1 if overlaps else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+-- Reject overlapping stays for the same room at the database level, so
+-- concurrent book_room / edit_booking calls cannot double-book a room.
+-- A conflicting insert or update fails with exclusion_violation (23P01),
+-- which the app treats as "room taken" and moves on to the next room.
+create extension if not exists btree_gist;
+
+alter table public.room_booking
+    add constraint room_booking_no_overlap
+    exclude using gist (
+        room_id with =,
+        tstzrange(check_in_date, check_out_date, '[)') with &&
+    );
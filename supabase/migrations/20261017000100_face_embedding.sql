@@ -0,0 +1,8 @@
+-- Precomputed face embeddings for guests who opted into facial ID. The
+-- app loads them into an in-memory gallery for kiosk matching and deletes
+-- the row as soon as the guest withdraws consent.
+create table if not exists public.face_embedding (
+    user_id uuid primary key references public.guest (user_id) on delete cascade,
+    embedding real[] not null,
+    enrolled_at timestamptz not null default now()
+);
@@ -0,0 +1,4 @@
+-- The log listing pages by (logged_time, id) descending, so each page is
+-- an index range scan instead of a sort over the whole table.
+create index if not exists logs_logged_time_id_idx
+    on public.logs (logged_time desc, id desc);